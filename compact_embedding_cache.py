@@ -0,0 +1,14 @@
+import argparse
+
+from config.config import RAGConfig
+from src.services.embedding_cache import EmbeddingCache, cache_model_name
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Garbage-collect the embedding cache")
+    parser.add_argument("--all-models", action="store_true", help="Keep entries of every embedding model")
+    args = parser.parse_args()
+
+    config = RAGConfig()
+    cache = EmbeddingCache(config)
+    keep_models = None if args.all_models else [cache_model_name(config)]
+    print(cache.compact(keep_models=keep_models))
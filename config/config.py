@@ -1,23 +1,115 @@
 from dataclasses import dataclass, field
-from typing import List
+from typing import Dict, List
 
 @dataclass
 class RAGConfig:
 
     DEFAULT_MODEL: str = "qwen3:1.7b"
+    OLLAMA_HOST: str | None = None
+    LLM_TIMEOUT_SECONDS: float = 120.0
+    LLM_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 3
+    LLM_BREAKER_SLOW_CALL_SECONDS: float = 60.0
+    LLM_BREAKER_RESET_SECONDS: float = 30.0
+    LLM_BREAKER_HISTORY: int = 50
+    LLM_FALLBACK_DOCUMENTS: int = 3
+    LLM_FALLBACK_EXCERPT_CHARS: int = 400
+    LLM_MAX_CONNECTIONS: int = 16
+    LLM_DEFAULT_CONCURRENCY: int = 2
+    LLM_MODEL_CONCURRENCY: Dict[str, int] = field(default_factory=lambda: {"qwen3:8b": 1})
+    LLM_DEFAULT_QUEUE_DEPTH: int = 2
+    LLM_MAX_QUEUE_DEPTH: Dict[str, int] = field(default_factory=lambda: {"chat": 8, "quiz": 2})
+    LLM_QUEUE_TIMEOUT_SECONDS: float = 60.0
+    HISTORY_MAX_SESSIONS: int = 256
+    HISTORY_TOKEN_BUDGET: int = 1024
+    HISTORY_FOLD_RATIO: float = 0.5
+    HISTORY_SUMMARY_MODEL: str = "qwen3:0.6b"
+    PRELOAD_MODELS: List[str] = field(default_factory=lambda: ["qwen3:1.7b"])
+    MODEL_WARMUP_PROMPT: str = "Hallo"
+    MODEL_KEEP_ALIVE_HOT: str = "30m"
+    MODEL_KEEP_ALIVE_COLD: str = "2m"
+    MODEL_HOT_THRESHOLD: int = 3
+    MODEL_USAGE_WINDOW_SECONDS: int = 900
+    MODEL_MEMORY_LIMIT_MB: int = 0
+    LLM_DEGRADE_MODELS: Dict[str, str] = field(default_factory=lambda: {"qwen3:8b": "qwen3:1.7b", "qwen3:1.7b": "qwen3:0.6b"})
+    ROUTING_MODELS: Dict[str, str] = field(default_factory=lambda: {"easy": "qwen3:0.6b", "medium": "qwen3:1.7b", "hard": "qwen3:8b"})
+    ROUTING_THINK: Dict[str, bool] = field(default_factory=lambda: {"easy": False, "medium": True, "hard": True})
+    ROUTING_SHORT_QUERY_WORDS: int = 8
+    ROUTING_LONG_QUERY_WORDS: int = 25
+    ROUTING_CLEAR_SCORE_SPREAD: float = 0.02
+    ROUTING_FLAT_SCORE_SPREAD: float = 0.005
+    ROUTING_CACHE_NEAR_MISS: float = 0.85
     EMBEDDING_MODEL: str = "intfloat/multilingual-e5-small"
     EMBEDDING_DIMENSION: int = 384
+    EMBEDDING_BACKEND: str = "torch"
+    ONNX_MODEL_DIR: str = "./data/models/multilingual-e5-small-onnx"
+    ONNX_NUM_THREADS: int = 0
+    ONNX_PARITY_MIN_COSINE: float = 0.98
 
     CHUNK_SIZE: int = 300
     CHUNK_OVERLAP: int = 30
+    CHUNKING_STRATEGY: str = "section"
     DEFAULT_TOP_K: int = 10
 
     SUPPORTED_EXTENSIONS: List[str] = field(default_factory=lambda: ['.pdf', '.docx'])
     INDEX_DIR: str = "./data/Index"
     DATA_DIR: str = "./data/files"
+    INGESTION_WORKERS: int = 1
+    INCREMENTAL_INDEXING: bool = True
+    PIPELINE_QUEUE_SIZE: int = 8
+    EMBED_BATCH_SIZE: int = 64
 
     PDF_CATEGORIES: List[str] = field(default_factory=lambda: ["Title", "NarrativeText"])
     LANGUAGE: str = "de"
+    LANGUAGE_DETECTOR: str = "langdetect"
+    LANGUAGE_DETECTOR_MODEL_PATH: str | None = None
+    LANGUAGE_MIN_TEXT_LENGTH: int = 30
+    LANGUAGE_DETECTION_BATCH_SIZE: int = 256
+    LANGUAGE_CACHE_SIZE: int = 50000
+
+    ELEMENT_CACHE_ENABLED: bool = True
+    ELEMENT_CACHE_DIR: str = "./data/cache/elements"
+    ELEMENT_CACHE_MAX_MB: int = 2048
+
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_DIR: str = "./data/cache/embeddings"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 1000000
+
+    FAISS_INDEX_FACTORY: str = "Flat"
+    FAISS_SEARCH_PARAMS: str = ""
+    FAISS_TRAIN_SAMPLE_SIZE: int = 50000
+    FAISS_RECALL_QUERIES: int = 200
+    FAISS_RECALL_K: int = 10
+    FAISS_RECALL_MAX_FRACTION: float = 0.05
+    INDEX_LOAD_MODE: str = "memory"
+    DOCSTORE_BACKEND: str = "json"
+
+    RETRIEVAL_MERGE_ADJACENT: bool = True
+    RETRIEVAL_DEDUP_THRESHOLD: float = 0.97
+    RETRIEVAL_MMR_ENABLED: bool = False
+    RETRIEVAL_MMR_LAMBDA: float = 0.7
+    RETRIEVAL_MMR_FETCH_FACTOR: int = 2
+
+    MODEL_TOKENIZERS: Dict[str, str] = field(default_factory=lambda: {"qwen3": "Qwen/Qwen3-1.7B"})
+    CONTEXT_TOKEN_BUDGETS: Dict[str, int] = field(default_factory=lambda: {
+        "qwen3:0.6b": 1500,
+        "qwen3:1.7b": 2500,
+        "qwen3:8b": 4000
+    })
+    DEFAULT_CONTEXT_TOKEN_BUDGET: int = 2500
+    CONTEXT_MIN_CHUNK_TOKENS: int = 50
+
+    QUERY_EMBEDDING_CACHE_SIZE: int = 2048
+    RETRIEVAL_CACHE_SIZE: int = 2048
+
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    SEMANTIC_CACHE_TTL_SECONDS: int = 86400
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 1000
+
+    QUIZ_BATCH_SIZE: int = 2
+    QUIZ_POOL_MAX_QUESTIONS: int = 30
+    QUIZ_POOL_MAX_TOPICS: int = 128
 
     LOG_LEVEL: str = "INFO"
     LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
\ No newline at end of file
@@ -1,6 +1,7 @@
 import os
 import json
 from src.core.rag_system import RAGSystem
+from config.config import RAGConfig
 
 from typing import Dict
 import numpy as np
@@ -19,7 +20,7 @@ client = OpenAI(base_url="https://llm.scads.ai/v1",api_key=my_api_key)
 def create_data():
 
     top_k_values = [5, 10, 15]
-    model_values = ['qwen3:0.6b', 'qwen3:1.7b', 'qwen3:8b']
+    model_values = ['qwen3:0.6b', 'qwen3:1.7b', 'qwen3:8b', 'auto']
 
     result = {
         "query": "",
@@ -27,7 +28,8 @@ def create_data():
         "answer": ""
     }
 
-    rag = RAGSystem()
+    # every run must generate its own answers instead of replaying another model's from the semantic cache
+    rag = RAGSystem(RAGConfig(SEMANTIC_CACHE_ENABLED=False))
 
     with open("../../Evaluierung/Fragen_Evaluierung") as f:
         lines = [line.rstrip() for line in f]
@@ -42,12 +44,18 @@ def create_data():
 
                     response = rag.chatbot_endpoint(line, model=model, top_k=top_k)
 
+                    # excerpts and answers from a fallback model would be scored as if the requested model wrote them
+                    if response['retrieval_only'] or (model != 'auto' and response['model'] != model):
+                        print(f"Skipping query '{line}': answered by {response['model'] or 'retrieval only'} instead of {model}")
+                        continue
+
                     documents = [document.get_text() for document in response['documents']]
 
                     result = {
                         "query": line,
                         "context": documents,
-                        "answer": response['answer']
+                        "answer": response['answer'],
+                        "model": response['model']
                     }
                     output.write(f"{json.dumps(result, ensure_ascii=False)},")
                 output.write("]")
@@ -11,4 +11,10 @@ class RetrievalError(RAGException):
     pass
 
 class LLMError(RAGException):
+    pass
+
+class LLMOverloadedError(LLMError):
+    pass
+
+class LLMUnavailableError(LLMError):
     pass
\ No newline at end of file
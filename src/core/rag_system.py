@@ -1,21 +1,59 @@
-from typing import List, Dict, Any, TypedDict
+import asyncio
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Dict, Any, Callable, Iterator, Tuple, TypedDict
 from pathlib import Path
 from llama_index.core.schema import NodeWithScore
 
 from config.logger_config import setup_logger
 from config.config import RAGConfig
-from src.core.exceptions import RAGException
+from src.core.exceptions import RAGException, LLMError, LLMOverloadedError, LLMUnavailableError
 from src.services.file_handler import FileHandler
 from src.services.document_processor import DocumentProcessor
+from src.services.ingestion_service import IngestionService
 from src.services.indexing_service import IndexingService
+from src.services.index_manifest import IndexManifest, ManifestChanges
+from src.services.indexing_pipeline import IndexingPipeline, PipelineResult
+from src.services.sqlite_kvstore import DOCSTORE_FILENAME
 from src.services.retrieval_service import RetrievalService
-from src.services.llm_service import LLMService
+from src.services.semantic_cache import SemanticCache, SemanticCacheHit
+from src.services.quiz_pool import QuizPool
+from src.services.llm_service import LLMService, QuizQuestion, StreamChunk
+from src.services.model_manager import ModelManager
+from src.services.model_router import AUTO_MODEL, RoutingDecision
+from src.services.context_packer import ContextPacker
+from src.services.llm_scheduler import LLMScheduler, Priority
 
 logger = setup_logger(__name__)
 
 class ChatbotResponse(TypedDict):
     documents: List[NodeWithScore]
     answer: str | None
+    context_tokens: int | None
+    queue_wait: float | None
+    retrieval_only: bool
+    model: str | None
+
+class ChatbotStreamResponse(TypedDict):
+    documents: List[NodeWithScore]
+    stream: Iterator[StreamChunk]
+    context_tokens: int | None
+
+@dataclass
+class _ChatbotContext:
+    generation: int
+    model: str
+    top_k: int
+    query_embedding: List[float]
+    cached: SemanticCacheHit | None
+    documents: List[NodeWithScore]
+    context_tokens: int | None
+    think: bool = True
+    routing: RoutingDecision | None = None
+    retrieval_only: bool = False
 
 class RAGSystem:
     
@@ -24,26 +62,51 @@ class RAGSystem:
         
         self.file_handler = FileHandler(self.config)
         self.document_processor = DocumentProcessor(self.config)
+        self.ingestion_service = IngestionService(self.config, self.document_processor)
         self.indexing_service = IndexingService(self.config)
         self.retrieval_service = RetrievalService(self.config)
-        self.llm_service = LLMService(self.config)
+        self.model_manager = ModelManager(self.config)
+        self.context_packer = ContextPacker(self.config)
+        self.scheduler = LLMScheduler(self.config)
+        self.llm_service = LLMService(self.config, self.model_manager, self.context_packer, self.scheduler)
+        self.indexing_pipeline = IndexingPipeline(self.config, self.ingestion_service, self.indexing_service)
+        self.semantic_cache = SemanticCache(self.config) if self.config.SEMANTIC_CACHE_ENABLED else None
+        self.quiz_pool = QuizPool(self.config)
         
         self._index = None
         self._vector_store = None
         self._docstore = None
+        self._index_version = None
+        self._indexed_files = None
+        # bumped on every index load so cached answers never outlive the index they came from
+        self._index_generation = 0
+        # guards building and swapping the index; queries work on a snapshot of self._index
+        self._lock = threading.RLock()
         
         logger.info("RAG System initialized successfully")
     
-    def initialize_system(self, data_path: str | None = None, force_rebuild: bool = False) -> None:
+    def initialize_system(self, data_path: str | None = None, force_rebuild: bool = False, preload_models: bool = True) -> None:
         try:
-            index_exists = Path(self.config.INDEX_DIR).exists()
+            with self._lock:
+                index_exists = Path(self.config.INDEX_DIR).exists()
+                
+                if not index_exists:
+                    logger.info("Building new index...")
+                    self._build_index(data_path or self.config.DATA_DIR)
+                elif force_rebuild:
+                    logger.info("Updating index...")
+                    self._update_index(data_path or self.config.DATA_DIR)
+                
+                logger.info("Loading index...")
+                self._load_index()
             
-            if not index_exists or force_rebuild:
-                logger.info("Building new index...")
-                self._build_index(data_path or self.config.DATA_DIR)
+            self.context_packer.load_tokenizers(
+                [self.config.DEFAULT_MODEL] + list(self.config.CONTEXT_TOKEN_BUDGETS) + list(self.config.ROUTING_MODELS.values())
+            )
             
-            logger.info("Loading index...")
-            self._load_index()
+            if preload_models and self.config.PRELOAD_MODELS:
+                logger.info(f"Preloading models: {', '.join(self.config.PRELOAD_MODELS)}")
+                self.model_manager.preload()
             
             logger.info("RAG System ready for queries")
             
@@ -51,18 +114,44 @@ class RAGSystem:
             logger.error(f"Failed to initialize RAG system: {str(e)}")
             raise RAGException(f"System initialization failed: {str(e)}")
     
-    def chatbot_endpoint(self, query: str, model: str | None, conversation_history: List[Dict] | None = None, top_k: int | None = None) -> ChatbotResponse:
+    def chatbot_endpoint(self, query: str, model: str | None, conversation_history: List[Dict] | None = None, top_k: int | None = None,
+                         session_id: str | None = None) -> ChatbotResponse:
         try:
             logger.info(f"Chatbot query received: '{query[:50]}...'")
             
-            if not self._index:
-                raise RAGException("System not initialized. Call initialize_system() first.")
+            context = self._prepare_chatbot(query, model, conversation_history, top_k)
+            if context.cached:
+                return ChatbotResponse(
+                    documents=context.documents, answer=context.cached.answer, context_tokens=None, queue_wait=None, retrieval_only=False,
+                    model=context.cached.model
+                )
+            
+            if context.retrieval_only:
+                return self._retrieval_only_response(context)
             
-            documents = self.retrieval_service.retrieve_documents(self._index, query, top_k)
+            try:
+                with self.scheduler.slot(context.model, Priority.CHAT) as admission:
+                    self._use_admitted_model(context, admission.model)
+                    answer = self.llm_service.generate_chatbot_response(
+                        query, context.documents, context.model, conversation_history, session_id, context.think
+                    )
+            except LLMOverloadedError:
+                raise
+            except LLMError as e:
+                logger.warning(f"Answering with retrieved documents only: {str(e)}")
+                return self._retrieval_only_response(context)
             
-            answer = self.llm_service.generate_chatbot_response(query, documents, model, conversation_history)
+            self._record_routing(context, admission.queue_wait + admission.generation_time)
+            self._store_answer(context, query, answer, conversation_history)
 
-            response = ChatbotResponse(documents=documents, answer=answer)
+            response = ChatbotResponse(
+                documents=context.documents,
+                answer=answer,
+                context_tokens=context.context_tokens,
+                queue_wait=admission.queue_wait,
+                retrieval_only=False,
+                model=context.model
+            )
 
             logger.info("Chatbot response generated successfully")
             return response
@@ -71,31 +160,174 @@ class RAGSystem:
             logger.error(f"Chatbot endpoint error: {str(e)}")
             raise RAGException(f"Chatbot query failed: {str(e)}")
     
-    def quiz_endpoint(self, interests: str, model: str | None, num_questions: int = 5, top_k: int | None = None) -> str | None:
+    def chatbot_stream_endpoint(self, query: str, model: str | None, conversation_history: List[Dict] | None = None, top_k: int | None = None,
+                                session_id: str | None = None) -> ChatbotStreamResponse:
         try:
-            logger.info(f"Quiz generation requested for interests: '{interests[:50]}...'")
+            logger.info(f"Streaming chatbot query received: '{query[:50]}...'")
+            
+            context = self._prepare_chatbot(query, model, conversation_history, top_k)
+            if context.cached:
+                return ChatbotStreamResponse(documents=context.documents, stream=self._replay_answer(context.cached.answer), context_tokens=None)
+            if context.retrieval_only:
+                answer = self._retrieval_only_answer(context.documents)
+                return ChatbotStreamResponse(documents=context.documents, stream=self._replay_answer(answer), context_tokens=None)
+            
+            def create_stream(admitted_model: str) -> Iterator[StreamChunk]:
+                self._use_admitted_model(context, admitted_model)
+                return self.llm_service.generate_chatbot_response_stream(
+                    query, context.documents, admitted_model, conversation_history, session_id, context.think
+                )
+            
+            stream = self._scheduled_stream(context.model, Priority.CHAT, create_stream)
+            stream = self._fallback_stream(stream, context)
+            stream = self._guard_stream(stream, "Chatbot query")
+            
+            if context.routing is not None:
+                stream = self._routing_stream(stream, context)
+            
+            if self._is_cacheable(conversation_history):
+                stream = self._cache_stream(stream, context, query)
+            
+            return ChatbotStreamResponse(documents=context.documents, stream=stream, context_tokens=context.context_tokens)
+            
+        except Exception as e:
+            logger.error(f"Chatbot stream endpoint error: {str(e)}")
+            raise RAGException(f"Chatbot query failed: {str(e)}")
+    
+    async def achatbot_endpoint(self, query: str, model: str | None, conversation_history: List[Dict] | None = None, top_k: int | None = None,
+                                timeout: float | None = None, session_id: str | None = None) -> ChatbotResponse:
+        try:
+            logger.info(f"Async chatbot query received: '{query[:50]}...'")
+            
+            # embedding and FAISS search are CPU-bound and must not block the event loop
+            context = await asyncio.to_thread(self._prepare_chatbot, query, model, conversation_history, top_k)
+            if context.cached:
+                return ChatbotResponse(
+                    documents=context.documents, answer=context.cached.answer, context_tokens=None, queue_wait=None, retrieval_only=False,
+                    model=context.cached.model
+                )
+            
+            if context.retrieval_only:
+                return self._retrieval_only_response(context)
+            
+            try:
+                async with self.scheduler.aslot(context.model, Priority.CHAT) as admission:
+                    self._use_admitted_model(context, admission.model)
+                    answer = await self.llm_service.agenerate_chatbot_response(
+                        query, context.documents, context.model, conversation_history, timeout, session_id, context.think
+                    )
+            except LLMOverloadedError:
+                raise
+            except LLMError as e:
+                logger.warning(f"Answering with retrieved documents only: {str(e)}")
+                return self._retrieval_only_response(context)
+            
+            self._record_routing(context, admission.queue_wait + admission.generation_time)
+            self._store_answer(context, query, answer, conversation_history)
+            
+            logger.info("Chatbot response generated successfully")
+            return ChatbotResponse(
+                documents=context.documents,
+                answer=answer,
+                context_tokens=context.context_tokens,
+                queue_wait=admission.queue_wait,
+                retrieval_only=False,
+                model=context.model
+            )
             
-            if not self._index:
+        except Exception as e:
+            logger.error(f"Async chatbot endpoint error: {str(e)}")
+            raise RAGException(f"Chatbot query failed: {str(e)}")
+    
+    def retrieval_batch_endpoint(self, queries: List[str], top_k: int | None = None) -> List[List[NodeWithScore]]:
+        try:
+            logger.info(f"Batch retrieval requested for {len(queries)} queries")
+            
+            generation = self._index_generation
+            index = self._index
+            if not index:
                 raise RAGException("System not initialized. Call initialize_system() first.")
             
-            retrieval_query = self._generate_retrieval_query(interests)
+            return self.retrieval_service.retrieve_batch(index, queries, top_k, index_version=generation)
             
-            documents = self.retrieval_service.retrieve_documents(self._index, retrieval_query, top_k)
+        except Exception as e:
+            logger.error(f"Batch retrieval endpoint error: {str(e)}")
+            raise RAGException(f"Batch retrieval failed: {str(e)}")
+    
+    def quiz_endpoint(self, interests: str, model: str | None, num_questions: int = 5, top_k: int | None = None) -> List[QuizQuestion]:
+        try:
+            logger.info(f"Quiz generation requested for interests: '{interests[:50]}...'")
+            
+            generation = self._index_generation
+            topic = self.quiz_pool.normalize_topic(interests)
+            questions = self.quiz_pool.take(generation, topic, num_questions)
+            missing = num_questions - len(questions)
             
-            quiz_json = self.llm_service.generate_quiz_questions(documents, model, num_questions)
+            if missing:
+                documents = self._prepare_quiz(interests, model, top_k)
+                existing = [question["question"] for question in self.quiz_pool.questions(generation, topic)]
+                batches = self._quiz_batches(documents, missing)
+                
+                # more batches in flight than the model has slots would only queue them and crowd out chat requests
+                workers = min(len(batches), self.scheduler.concurrency(self._resolve_model(model)))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = [
+                        executor.submit(self._generate_quiz_batch, batch_documents, batch_size, model, existing)
+                        for batch_documents, batch_size in batches
+                    ]
+                    results = [future.exception() or future.result() for future in futures]
+                
+                questions += self._collect_quiz_batches(generation, topic, results, questions, missing)
             
-            logger.info("Quiz questions generated successfully")
-            return quiz_json
+            logger.info(f"Quiz with {len(questions)}/{num_questions} questions ready")
+            return questions
             
         except Exception as e:
             logger.error(f"Quiz endpoint error: {str(e)}")
             raise RAGException(f"Quiz generation failed: {str(e)}")
     
-    def character_endpoint(self, query: str, model: str | None, character: str = "faust", temperature: float = 0.9) -> str | None:
+    async def aquiz_endpoint(self, interests: str, model: str | None, num_questions: int = 5, top_k: int | None = None,
+                             timeout: float | None = None) -> List[QuizQuestion]:
+        try:
+            logger.info(f"Async quiz generation requested for interests: '{interests[:50]}...'")
+            
+            generation = self._index_generation
+            topic = self.quiz_pool.normalize_topic(interests)
+            questions = self.quiz_pool.take(generation, topic, num_questions)
+            missing = num_questions - len(questions)
+            
+            if missing:
+                documents = await asyncio.to_thread(self._prepare_quiz, interests, model, top_k)
+                existing = [question["question"] for question in self.quiz_pool.questions(generation, topic)]
+                batches = self._quiz_batches(documents, missing)
+                
+                in_flight = asyncio.Semaphore(self.scheduler.concurrency(self._resolve_model(model)))
+                results = await asyncio.gather(
+                    *[
+                        self._agenerate_quiz_batch(batch_documents, batch_size, model, existing, timeout, in_flight)
+                        for batch_documents, batch_size in batches
+                    ],
+                    return_exceptions=True
+                )
+                
+                questions += self._collect_quiz_batches(generation, topic, results, questions, missing)
+            
+            logger.info(f"Quiz with {len(questions)}/{num_questions} questions ready")
+            return questions
+            
+        except Exception as e:
+            logger.error(f"Async quiz endpoint error: {str(e)}")
+            raise RAGException(f"Quiz generation failed: {str(e)}")
+    
+    def character_endpoint(self, query: str, model: str | None, character: str = "faust", temperature: float = 0.9,
+                           conversation_history: List[Dict] | None = None, session_id: str | None = None) -> str | None:
         try:
             logger.info(f"Character conversation with {character}: '{query[:50]}...'")
             
-            response = self.llm_service.generate_character_response(query, model, character, temperature)
+            with self.scheduler.slot(self._available_model(model), Priority.CHAT) as admission:
+                response = self.llm_service.generate_character_response(
+                    query, admission.model, character, temperature, conversation_history, session_id
+                )
             
             logger.info(f"{character} response generated successfully")
             return response
@@ -104,47 +336,362 @@ class RAGSystem:
             logger.error(f"Character endpoint error: {str(e)}")
             raise RAGException(f"Character conversation failed: {str(e)}")
     
-    def _build_index(self, data_path: str) -> None:
-        logger.info(f"Building index from {data_path}")
+    async def acharacter_endpoint(self, query: str, model: str | None, character: str = "faust", temperature: float = 0.9,
+                                  timeout: float | None = None, conversation_history: List[Dict] | None = None,
+                                  session_id: str | None = None) -> str | None:
+        try:
+            logger.info(f"Async character conversation with {character}: '{query[:50]}...'")
+            
+            async with self.scheduler.aslot(self._available_model(model), Priority.CHAT) as admission:
+                response = await self.llm_service.agenerate_character_response(
+                    query, admission.model, character, temperature, timeout, conversation_history, session_id
+                )
+            
+            logger.info(f"{character} response generated successfully")
+            return response
+            
+        except Exception as e:
+            logger.error(f"Async character endpoint error: {str(e)}")
+            raise RAGException(f"Character conversation failed: {str(e)}")
+    
+    def character_stream_endpoint(self, query: str, model: str | None, character: str = "faust", temperature: float = 0.9,
+                                  conversation_history: List[Dict] | None = None, session_id: str | None = None) -> Iterator[StreamChunk]:
+        try:
+            logger.info(f"Streaming character conversation with {character}: '{query[:50]}...'")
+            
+            stream = self._scheduled_stream(
+                self._available_model(model),
+                Priority.CHAT,
+                lambda admitted_model: self.llm_service.generate_character_response_stream(
+                    query, admitted_model, character, temperature, conversation_history, session_id
+                )
+            )
+            
+            return self._guard_stream(stream, "Character conversation")
+            
+        except Exception as e:
+            logger.error(f"Character stream endpoint error: {str(e)}")
+            raise RAGException(f"Character conversation failed: {str(e)}")
+    
+    def _scheduled_stream(self, model: str, priority: Priority, create_stream: Callable[[str], Iterator[StreamChunk]]) -> Iterator[StreamChunk]:
+        # the slot is held until the stream is exhausted or closed by the consumer
+        with self.scheduler.slot(model, priority) as admission:
+            for chunk in create_stream(admission.model):
+                if chunk["type"] == "done":
+                    chunk["queue_wait"] = admission.queue_wait
+                yield chunk
+    
+    def _guard_stream(self, stream: Iterator[StreamChunk], action: str) -> Iterator[StreamChunk]:
+        try:
+            yield from stream
+        except Exception as e:
+            logger.error(f"{action} stream error: {str(e)}")
+            raise RAGException(f"{action} failed: {str(e)}")
+    
+    def _prepare_chatbot(self, query: str, model: str | None, conversation_history: List[Dict] | None, top_k: int | None) -> _ChatbotContext:
+        generation = self._index_generation
+        index = self._index
+        if not index:
+            raise RAGException("System not initialized. Call initialize_system() first.")
+        
+        auto = model == AUTO_MODEL
+        model_name = self._resolve_model(model)
+        k = top_k or self.config.DEFAULT_TOP_K
+        query_embedding = self.retrieval_service.embed_query(index, query)
+        
+        # in routing mode an answer from any model is good enough to reuse
+        cached = self._lookup_answer(generation, None if auto else model_name, k, query_embedding, conversation_history)
+        if cached:
+            return _ChatbotContext(generation, model_name, k, query_embedding, cached, cached.documents, None)
+        
+        documents = self.retrieval_service.retrieve_documents(index, query, k, query_embedding, index_version=generation)
+        
+        routing = None
+        if auto:
+            cache_similarity = None
+            if self.semantic_cache is not None:
+                cache_similarity = self.semantic_cache.nearest_similarity(generation, None, k, query_embedding)
+            routing = self.llm_service.route_model(query, documents, cache_similarity)
+            model_name = routing.model
+        
+        available_model = self.llm_service.available_model(model_name)
+        packed = self.context_packer.pack(documents, available_model or model_name)
+        
+        return _ChatbotContext(
+            generation, available_model or model_name, k, query_embedding, None, packed.documents, packed.tokens_used,
+            think=routing.think if routing else True, routing=routing, retrieval_only=available_model is None
+        )
+    
+    def _use_admitted_model(self, context: _ChatbotContext, model: str) -> None:
+        # a request the scheduler degraded to a smaller model must also fit that model's context budget
+        if model != context.model:
+            packed = self.context_packer.pack(context.documents, model)
+            context.documents, context.context_tokens = packed.documents, packed.tokens_used
+        context.model = model
+    
+    def _prepare_quiz(self, interests: str, model: str | None, top_k: int | None) -> List[NodeWithScore]:
+        generation = self._index_generation
+        index = self._index
+        if not index:
+            raise RAGException("System not initialized. Call initialize_system() first.")
+        
+        retrieval_query = self._generate_retrieval_query(interests)
+        
+        documents = self.retrieval_service.retrieve_documents(index, retrieval_query, top_k, index_version=generation)
+        return self.context_packer.pack(documents, self._resolve_model(model)).documents
+    
+    def _quiz_batches(self, documents: List[NodeWithScore], num_questions: int) -> List[Tuple[List[NodeWithScore], int]]:
+        batch_size = max(self.config.QUIZ_BATCH_SIZE, 1)
+        batch_count = -(-num_questions // batch_size)
+        
+        # every batch gets its own share of the documents so the batches do not ask the same questions
+        return [
+            (documents[i::batch_count] or documents, min(batch_size, num_questions - i * batch_size))
+            for i in range(batch_count)
+        ]
+    
+    def _generate_quiz_batch(self, documents: List[NodeWithScore], num_questions: int, model: str | None,
+                             existing: List[str]) -> List[QuizQuestion]:
+        with self.scheduler.slot(self._available_model(model), Priority.QUIZ) as admission:
+            return self.llm_service.generate_quiz_questions(documents, admission.model, num_questions, existing)
+    
+    async def _agenerate_quiz_batch(self, documents: List[NodeWithScore], num_questions: int, model: str | None,
+                                    existing: List[str], timeout: float | None, in_flight: asyncio.Semaphore) -> List[QuizQuestion]:
+        async with in_flight, self.scheduler.aslot(self._available_model(model), Priority.QUIZ) as admission:
+            return await self.llm_service.agenerate_quiz_questions(documents, admission.model, num_questions, timeout, existing)
+    
+    def _collect_quiz_batches(self, generation: int, topic: str, results: List, pooled: List[QuizQuestion],
+                              missing: int) -> List[QuizQuestion]:
+        errors = [result for result in results if isinstance(result, BaseException)]
+        for error in errors:
+            logger.warning(f"Quiz batch failed: {str(error)}")
+        if len(errors) == len(results) and not pooled:
+            raise errors[0]
         
+        seen = {question["question"].strip().lower() for question in pooled}
+        generated = []
+        for result in results:
+            if isinstance(result, BaseException):
+                continue
+            for question in result:
+                if question["question"].strip().lower() not in seen:
+                    seen.add(question["question"].strip().lower())
+                    generated.append(question)
+        
+        self.quiz_pool.add(generation, topic, generated)
+        return generated[:missing]
+    
+    def _is_cacheable(self, conversation_history: List[Dict] | None) -> bool:
+        # follow-up questions depend on the conversation, so only opening questions are cached
+        return self.semantic_cache is not None and not conversation_history
+    
+    def _lookup_answer(self, generation: int, model: str | None, top_k: int, query_embedding: List[float],
+                       conversation_history: List[Dict] | None) -> SemanticCacheHit | None:
+        if not self._is_cacheable(conversation_history):
+            return None
+        return self.semantic_cache.lookup(generation, model, top_k, query_embedding)
+    
+    def _store_answer(self, context: _ChatbotContext, query: str, answer: str | None, conversation_history: List[Dict] | None) -> None:
+        if self._is_cacheable(conversation_history) and not context.retrieval_only:
+            self.semantic_cache.store(
+                context.generation, context.model, context.top_k, query, context.query_embedding, answer, context.documents
+            )
+    
+    def _replay_answer(self, answer: str) -> Iterator[StreamChunk]:
+        yield StreamChunk(type="answer", content=answer)
+        yield StreamChunk(
+            type="done",
+            content="",
+            time_to_first_token=0.0,
+            time_to_first_answer_token=0.0,
+            total_time=0.0
+        )
+    
+    def _cache_stream(self, stream: Iterator[StreamChunk], context: _ChatbotContext, query: str) -> Iterator[StreamChunk]:
+        answer_parts = []
+        for chunk in stream:
+            if chunk["type"] == "answer":
+                answer_parts.append(chunk["content"])
+            yield chunk
+        
+        # only streams that ran to completion are stored
+        self._store_answer(context, query, "".join(answer_parts), None)
+    
+    def _resolve_model(self, model: str | None) -> str:
+        # automatic routing is only available for chatbot queries, everything else runs on the default model
+        return self.config.DEFAULT_MODEL if not model or model == AUTO_MODEL else model
+    
+    def _available_model(self, model: str | None) -> str:
+        available_model = self.llm_service.available_model(self._resolve_model(model))
+        if available_model is None:
+            raise LLMUnavailableError("The language model is temporarily unavailable, please try again shortly")
+        return available_model
+    
+    def _retrieval_only_response(self, context: _ChatbotContext) -> ChatbotResponse:
+        return ChatbotResponse(
+            documents=context.documents,
+            answer=self._retrieval_only_answer(context.documents),
+            context_tokens=None,
+            queue_wait=None,
+            retrieval_only=True,
+            model=None
+        )
+    
+    def _retrieval_only_answer(self, documents: List[NodeWithScore]) -> str:
+        excerpts = []
+        for document in documents[:self.config.LLM_FALLBACK_DOCUMENTS]:
+            source = Path(document.node.metadata.get("file_path", "")).name or "Unbekannte Quelle"
+            text = document.get_text().strip()
+            if len(text) > self.config.LLM_FALLBACK_EXCERPT_CHARS:
+                text = text[:self.config.LLM_FALLBACK_EXCERPT_CHARS].rsplit(" ", 1)[0] + " …"
+            excerpts.append(f"**{source}**\n\n{text}")
+        
+        if not excerpts:
+            return "Der Sprachassistent ist im Moment nicht erreichbar. Bitte versuchen Sie es in Kürze erneut."
+        return (
+            "Der Sprachassistent ist im Moment nicht erreichbar. "
+            "Diese Textstellen aus der Museumsdatenbank passen am besten zu Ihrer Frage:\n\n" + "\n\n---\n\n".join(excerpts)
+        )
+    
+    def _fallback_stream(self, stream: Iterator[StreamChunk], context: _ChatbotContext) -> Iterator[StreamChunk]:
+        answered = False
+        try:
+            for chunk in stream:
+                answered = answered or chunk["type"] == "answer"
+                yield chunk
+        except LLMOverloadedError:
+            raise
+        except LLMError as e:
+            # once part of an answer is shown it cannot be replaced anymore
+            if answered:
+                raise
+            logger.warning(f"Answering with retrieved documents only: {str(e)}")
+            context.retrieval_only = True
+            yield from self._replay_answer(self._retrieval_only_answer(context.documents))
+    
+    def _record_routing(self, context: _ChatbotContext, latency: float) -> None:
+        if context.routing is not None and not context.retrieval_only:
+            self.llm_service.model_router.record(context.routing, latency, context.model)
+    
+    def _routing_stream(self, stream: Iterator[StreamChunk], context: _ChatbotContext) -> Iterator[StreamChunk]:
+        for chunk in stream:
+            if chunk["type"] == "done":
+                self._record_routing(context, chunk.get("queue_wait", 0.0) + chunk["total_time"])
+            yield chunk
+    
+    def _discover_files(self, data_path: str) -> List[str]:
         all_files = self.file_handler.get_files_recursive(data_path)
         
         supported_files = self.file_handler.filter_supported_files(all_files)
         
-        content_list = []
-        total_files = sum(len(files) for files in supported_files.values())
-        processed_count = 0
-        
-        for ext, files in supported_files.items():
-            for file_path in files:
-                try:
-                    if ext == '.pdf':
-                        content = self.document_processor.process_pdf(file_path)
-                    elif ext == '.docx':
-                        content = self.document_processor.process_docx(file_path)
-                    else:
-                        continue
-                    
-                    content_list.append(content)
-                    processed_count += 1
-                    logger.info(f"Processed {processed_count}/{total_files}: {file_path}")
-                    
-                except Exception as e:
-                    logger.warning(f"Failed to process {file_path}: {str(e)}")
-                    continue
-        
-        if not content_list:
+        return [file_path for files in supported_files.values() for file_path in files]
+    
+    def _build_index(self, data_path: str) -> None:
+        logger.info(f"Building index from {data_path}")
+        
+        files = self._discover_files(data_path)
+        
+        manifest = IndexManifest(self.config)
+        changes = manifest.diff(files)
+        
+        staging_dir = self._prepare_staging_dir(copy_docstore=False)
+        index = self.indexing_service.create_faiss_index(staging_dir)
+        result = self.indexing_pipeline.run(index, changes.to_parse, evaluate_recall=True)
+        
+        if not result.node_ids:
             raise RAGException("No documents were successfully processed")
         
-        documents = self.indexing_service.create_documents(content_list)
-        index = self.indexing_service.create_faiss_index(documents)
+        self._record_in_manifest(manifest, changes, result)
         
-        self.indexing_service.save_index(index, './data/Index')
+        self.indexing_service.save_index(index, staging_dir)
+        manifest.save(staging_dir)
+        self._publish_staging_dir(staging_dir)
         
-        logger.info(f"Index built successfully with {len(documents)} documents")
+        logger.info(f"Index built successfully with {len(result.node_ids)} documents")
+    
+    def _update_index(self, data_path: str) -> None:
+        manifest = IndexManifest.load(self.config, self.config.INDEX_DIR)
+        
+        if not self.config.INCREMENTAL_INDEXING or manifest is None or not manifest.is_compatible():
+            logger.info("No compatible manifest found, rebuilding the whole index")
+            self._build_index(data_path)
+            return
+        
+        logger.info(f"Updating index from {data_path}")
+        
+        files = self._discover_files(data_path)
+        changes = manifest.diff(files)
+        
+        if not changes.has_changes:
+            logger.info("Index is up to date")
+            manifest.save(self.config.INDEX_DIR)
+            return
+        
+        if changes.to_remove and not self.indexing_service.supports_removal():
+            logger.info(f"'{self.config.FAISS_INDEX_FACTORY}' cannot remove vectors, rebuilding the whole index")
+            self._build_index(data_path)
+            return
+        
+        staging_dir = self._prepare_staging_dir(copy_docstore=True)
+        index, _, _ = self.indexing_service.load_index(self.config.INDEX_DIR, mmap=False, docstore_dir=staging_dir)
+        
+        stale_node_ids = manifest.remove(changes.to_remove)
+        self.indexing_service.delete_nodes(index, stale_node_ids)
+        
+        result = self.indexing_pipeline.run(index, changes.to_parse)
+        
+        self._record_in_manifest(manifest, changes, result)
+        manifest.bump_version()
+        
+        self.indexing_service.save_index(index, staging_dir)
+        manifest.save(staging_dir)
+        self._publish_staging_dir(staging_dir)
+        
+        logger.info(
+            f"Index updated: {len(result.node_ids)} files (re)indexed, "
+            f"{len(changes.to_remove)} files removed, {len(stale_node_ids)} stale nodes deleted"
+        )
+    
+    def _prepare_staging_dir(self, copy_docstore: bool) -> str:
+        # builds write next to the live index, which may be memory-mapped or open in SQLite
+        staging_dir = Path(f"{Path(self.config.INDEX_DIR)}.staging")
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        staging_dir.mkdir(parents=True)
+        
+        docstore_path = Path(self.config.INDEX_DIR) / DOCSTORE_FILENAME
+        if copy_docstore and docstore_path.exists():
+            shutil.copy2(docstore_path, staging_dir / DOCSTORE_FILENAME)
+        
+        return str(staging_dir)
+    
+    def _publish_staging_dir(self, staging_dir: str) -> None:
+        index_dir = Path(self.config.INDEX_DIR)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        
+        # rename keeps the old inodes alive for readers that still map them
+        for staged_file in Path(staging_dir).iterdir():
+            os.replace(staged_file, index_dir / staged_file.name)
+        Path(staging_dir).rmdir()
+    
+    def _record_in_manifest(self, manifest: IndexManifest, changes: ManifestChanges, result: PipelineResult) -> None:
+        for file_path, node_ids in result.node_ids.items():
+            manifest.record(file_path, changes.fingerprints[file_path], node_ids)
     
     def _load_index(self) -> None:
-        self._index, self._vector_store, self._docstore = self.indexing_service.load_index('./data/Index')
+        index, vector_store, docstore = self.indexing_service.load_index(self.config.INDEX_DIR)
+        manifest = IndexManifest.load(self.config, self.config.INDEX_DIR)
+        
+        self._vector_store, self._docstore = vector_store, docstore
+        self._index_version = manifest.version if manifest else None
+        self._indexed_files = len(manifest.files) if manifest else None
+        self._index = index
+        
+        self._index_generation += 1
+        self.retrieval_service.set_index_version(self._index_generation)
+        if self.semantic_cache is not None:
+            self.semantic_cache.invalidate(self._index_generation)
+        self.quiz_pool.invalidate(self._index_generation)
+        
         logger.info("Index loaded successfully")
     
     def _generate_retrieval_query(self, interests: str) -> str:
@@ -158,10 +705,21 @@ class RAGSystem:
                 "model": self.config.DEFAULT_MODEL,
                 "embedding_model": self.config.EMBEDDING_MODEL,
                 "chunk_size": self.config.CHUNK_SIZE,
+                "faiss_index": self.config.FAISS_INDEX_FACTORY,
                 "default_top_k": self.config.DEFAULT_TOP_K
             },
             "index_info": {
                 "exists": Path(self.config.INDEX_DIR).exists(),
-                "path": self.config.INDEX_DIR
-            }
+                "path": self.config.INDEX_DIR,
+                "version": self._index_version,
+                "indexed_files": self._indexed_files
+            },
+            "scheduler": self.scheduler.stats(),
+            "resident_models": self.model_manager.resident_models(),
+            "retrieval_cache": self.retrieval_service.cache_stats(),
+            "semantic_cache": self.semantic_cache.stats() if self.semantic_cache is not None else None,
+            "history": self.llm_service.history_manager.stats(),
+            "quiz_pool": self.quiz_pool.stats(),
+            "routing": self.llm_service.model_router.stats(),
+            "circuit_breaker": self.llm_service.circuit_breaker.stats()
         }
\ No newline at end of file
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict
+
+from config.logger_config import setup_logger
+from config.config import RAGConfig
+
+logger = setup_logger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+@dataclass
+class _ModelCircuit:
+    state: str = CLOSED
+    consecutive_failures: int = 0
+    opened_at: float = 0.0
+    probe_in_flight: bool = False
+    trips: int = 0
+    failures: int = 0
+    slow_calls: int = 0
+
+class CircuitBreaker:
+
+    def __init__(self, config: RAGConfig = RAGConfig()):
+        self.config = config
+        self._circuits: Dict[str, _ModelCircuit] = {}
+        self._transitions: Deque[Dict[str, Any]] = deque(maxlen=config.LLM_BREAKER_HISTORY)
+        self._lock = threading.Lock()
+        logger.info("CircuitBreaker initialized")
+
+    def available(self, model: str) -> bool:
+        with self._lock:
+            circuit = self._refresh(model)
+            return circuit.state == CLOSED or (circuit.state == HALF_OPEN and not circuit.probe_in_flight)
+
+    def allow(self, model: str) -> bool:
+        with self._lock:
+            circuit = self._refresh(model)
+            if circuit.state == CLOSED:
+                return True
+            # a half-open circuit lets a single probe through to find out whether the backend recovered
+            if circuit.state == HALF_OPEN and not circuit.probe_in_flight:
+                circuit.probe_in_flight = True
+                return True
+            return False
+
+    def release(self, model: str) -> None:
+        # a call that was cancelled before it could tell anything about the backend
+        with self._lock:
+            self._circuit_for(model).probe_in_flight = False
+
+    def record_success(self, model: str, latency: float) -> None:
+        # a call that succeeds but is too slow still counts against the model
+        if latency > self.config.LLM_BREAKER_SLOW_CALL_SECONDS:
+            with self._lock:
+                self._circuit_for(model).slow_calls += 1
+            self._record_failure(model, f"slow response ({latency:.1f}s)")
+            return
+
+        with self._lock:
+            circuit = self._circuit_for(model)
+            circuit.consecutive_failures = 0
+            circuit.probe_in_flight = False
+            if circuit.state != CLOSED:
+                self._transition(model, circuit, CLOSED, "probe succeeded")
+
+    def record_failure(self, model: str, error: Exception) -> None:
+        with self._lock:
+            self._circuit_for(model).failures += 1
+        self._record_failure(model, str(error))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "models": {
+                    model: {
+                        "state": circuit.state,
+                        "consecutive_failures": circuit.consecutive_failures,
+                        "failures": circuit.failures,
+                        "slow_calls": circuit.slow_calls,
+                        "trips": circuit.trips
+                    }
+                    for model, circuit in self._circuits.items()
+                },
+                "transitions": list(self._transitions)
+            }
+
+    def _record_failure(self, model: str, reason: str) -> None:
+        with self._lock:
+            circuit = self._circuit_for(model)
+            circuit.consecutive_failures += 1
+            circuit.probe_in_flight = False
+            if circuit.state == HALF_OPEN or (
+                circuit.state == CLOSED and circuit.consecutive_failures >= self.config.LLM_BREAKER_FAILURE_THRESHOLD
+            ):
+                circuit.opened_at = time.time()
+                circuit.trips += 1
+                self._transition(model, circuit, OPEN, reason)
+
+    def _refresh(self, model: str) -> _ModelCircuit:
+        # callers hold the lock
+        circuit = self._circuit_for(model)
+        if circuit.state == OPEN and time.time() - circuit.opened_at >= self.config.LLM_BREAKER_RESET_SECONDS:
+            self._transition(model, circuit, HALF_OPEN, "reset timeout elapsed")
+        return circuit
+
+    def _transition(self, model: str, circuit: _ModelCircuit, state: str, reason: str) -> None:
+        # callers hold the lock
+        logger.warning(f"Circuit for {model} changed from {circuit.state} to {state}: {reason}")
+        self._transitions.append({"model": model, "from": circuit.state, "to": state, "reason": reason, "at": time.time()})
+        circuit.state = state
+
+    def _circuit_for(self, model: str) -> _ModelCircuit:
+        return self._circuits.setdefault(model, _ModelCircuit())
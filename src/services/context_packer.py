@@ -0,0 +1,98 @@
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from llama_index.core.schema import NodeWithScore
+from transformers import AutoTokenizer, PreTrainedTokenizerBase, PreTrainedTokenizerFast
+
+from config.logger_config import setup_logger
+from config.config import RAGConfig
+
+logger = setup_logger(__name__)
+
+DOCUMENT_SEPARATOR = "\n\n"
+
+@dataclass
+class PackedContext:
+    documents: List[NodeWithScore] = field(default_factory=list)
+    tokens_used: int = 0
+    token_budget: int = 0
+    dropped: int = 0
+    truncated: int = 0
+
+class ContextPacker:
+
+    def __init__(self, config: RAGConfig = RAGConfig()):
+        self.config = config
+        self._tokenizers: Dict[str, PreTrainedTokenizerBase] = {}
+        self._lock = threading.Lock()
+        logger.info("ContextPacker initialized")
+
+    def load_tokenizers(self, models: List[str]) -> None:
+        # loading at startup keeps the Hub download off the first user query
+        for model in models:
+            self._get_tokenizer(model)
+
+    def token_budget(self, model: str) -> int:
+        return self.config.CONTEXT_TOKEN_BUDGETS.get(model, self.config.DEFAULT_CONTEXT_TOKEN_BUDGET)
+
+    def count_tokens(self, model: str, text: str) -> int:
+        return len(self._get_tokenizer(model).encode(text, add_special_tokens=False))
+
+    def pack(self, documents: List[NodeWithScore], model: str) -> PackedContext:
+        tokenizer = self._get_tokenizer(model)
+        budget = self.token_budget(model)
+        separator_tokens = len(tokenizer.encode(DOCUMENT_SEPARATOR, add_special_tokens=False))
+        packed = PackedContext(token_budget=budget)
+
+        # documents arrive in relevance order, so the least relevant ones are cut first
+        for document in documents:
+            token_ids = tokenizer.encode(document.get_text(), add_special_tokens=False)
+            cost = len(token_ids) + (separator_tokens if packed.documents else 0)
+            remaining = budget - packed.tokens_used
+
+            if cost <= remaining:
+                packed.documents.append(document)
+                packed.tokens_used += cost
+                continue
+
+            available = remaining - (separator_tokens if packed.documents else 0)
+            if available >= self.config.CONTEXT_MIN_CHUNK_TOKENS:
+                truncated_text = tokenizer.decode(token_ids[:available], skip_special_tokens=True)
+                node = document.node.model_copy(update={"text": truncated_text})
+                packed.documents.append(NodeWithScore(node=node, score=document.score))
+                packed.tokens_used += cost - len(token_ids) + available
+                packed.truncated += 1
+            else:
+                packed.dropped += 1
+
+        logger.info(
+            f"Packed {len(packed.documents)}/{len(documents)} documents into {packed.tokens_used}/{budget} tokens "
+            f"for {model} ({packed.truncated} truncated, {packed.dropped} dropped)"
+        )
+        return packed
+
+    def _get_tokenizer(self, model: str) -> PreTrainedTokenizerBase:
+        family = model.split(":")[0]
+        with self._lock:
+            if family not in self._tokenizers:
+                self._tokenizers[family] = self._load_tokenizer(family)
+            return self._tokenizers[family]
+
+    def _load_tokenizer(self, family: str) -> PreTrainedTokenizerBase:
+        tokenizer_name = self.config.MODEL_TOKENIZERS.get(family)
+        if tokenizer_name:
+            try:
+                # the pinned transformers predates Qwen2Tokenizer, but the fast class reads tokenizer.json directly
+                tokenizer = PreTrainedTokenizerFast.from_pretrained(tokenizer_name)
+                logger.info(f"Counting context tokens for '{family}' with {tokenizer_name}")
+                return tokenizer
+            except Exception as e:
+                logger.warning(f"Could not load tokenizer {tokenizer_name}: {str(e)}")
+
+        # the embedding tokenizer is always available locally and gives a close estimate
+        logger.warning(
+            f"Falling back to the {self.config.EMBEDDING_MODEL} tokenizer for model family '{family}', "
+            "context budgets are only approximate"
+        )
+        return AutoTokenizer.from_pretrained(self.config.EMBEDDING_MODEL)
@@ -1,10 +1,12 @@
-from typing import List, Dict
+from typing import Callable, List, Dict
+from pathlib import Path
 from unstructured.partition.pdf import partition_pdf
 from unstructured.partition.docx import partition_docx
-from langdetect import detect
 
 from config.logger_config import setup_logger
 from src.core.exceptions import FileProcessingError
+from src.services.element_cache import ElementCache
+from src.services.language_detector import LanguageFilter
 from config.config import RAGConfig
 
 logger = setup_logger(__name__)
@@ -13,12 +15,22 @@ class DocumentProcessor:
 
     def __init__(self, config: RAGConfig = RAGConfig()):
         self.config = config
+        self.element_cache = ElementCache(config) if config.ELEMENT_CACHE_ENABLED else None
+        self.language_filter = LanguageFilter(config)
         logger.info("DocumentProcessor initialized")
 
+    def process_file(self, file_path: str) -> str:
+        extension = Path(file_path).suffix.lower()
+        if extension == '.pdf':
+            return self.process_pdf(file_path)
+        if extension == '.docx':
+            return self.process_docx(file_path)
+        raise FileProcessingError(f"Unsupported file type: {extension}")
+
     def process_pdf(self, file_path: str) -> str:
         try:
             logger.info(f"Processing PDF: {file_path}")
-            elements = partition_pdf(filename=file_path, strategy="auto")
+            elements = self._partition(file_path, "pdf_auto", lambda: partition_pdf(filename=file_path, strategy="auto"))
 
             filtered_elements = self._filter_elements(elements, self.config.PDF_CATEGORIES)
             language_filtered = self._filter_by_language(filtered_elements, self.config.LANGUAGE)
@@ -36,7 +48,7 @@ class DocumentProcessor:
     def process_docx(self, file_path: str) -> str:
         try:
             logger.info(f"Processing DOCX: {file_path}")
-            elements = partition_docx(file_path)
+            elements = self._partition(file_path, "docx", lambda: partition_docx(file_path))
 
             language_filtered = self._filter_by_language(elements, self.config.LANGUAGE)
 
@@ -50,21 +62,25 @@ class DocumentProcessor:
             logger.error(f"Error processing DOCX: {file_path}")
             raise FileProcessingError(f"Failed to process DOCX: {str(e)}")
         
+    def _partition(self, file_path: str, partitioner: str, partition: Callable[[], List]) -> List:
+        if self.element_cache is None:
+            return partition()
+
+        key = self.element_cache.make_key(file_path, partitioner)
+        elements = self.element_cache.get(key)
+        if elements is not None:
+            logger.info(f"Loaded {len(elements)} cached elements for {file_path}")
+            return elements
+
+        elements = partition()
+        self.element_cache.put(key, elements)
+        return elements
+        
     def _filter_elements(self, elements: List, categories: List[str]) -> List:
         return [el for el in elements if el.category in categories]
     
     def _filter_by_language(self, elements: List, target_language: str) -> List:
-        filtered_elements = []
-
-        for element in elements:
-            try:
-                detected_lang = detect(element.text)
-                if detected_lang == target_language:
-                    filtered_elements.append(element)
-            except Exception:
-                continue
-        logger.debug(f"Language filtering: {len(filtered_elements)}/{len(elements)} elements kept")
-        return filtered_elements
+        return self.language_filter.filter(elements, target_language)
     
     def _extract_content(self, elements: List) -> List[Dict]:
         content = []
@@ -102,5 +118,18 @@ class DocumentProcessor:
         
         return "\n".join(md_lines)
     
+    @staticmethod
+    def parse_sections(markdown: str) -> List[Dict]:
+        # inverse of _create_markdown, so chunking can follow the sections after the text went through the pipeline
+        sections = []
+        for line in markdown.split("\n"):
+            if line.startswith("# "):
+                sections.append({"title": line[2:], "text": []})
+            elif line.strip():
+                if not sections:
+                    sections.append({"title": "Default", "text": []})
+                sections[-1]["text"].append(line)
+        return sections
+    
     def _create_content_string(self, elements: List) -> str:
         return " ".join(element.text for element in elements)
\ No newline at end of file
@@ -0,0 +1,90 @@
+import gzip
+import json
+import os
+from pathlib import Path
+from typing import List
+
+from unstructured.staging.base import elements_from_dicts, elements_to_dicts
+
+from config.logger_config import setup_logger
+from src.services.file_handler import FileHandler
+from config.config import RAGConfig
+
+logger = setup_logger(__name__)
+
+CACHE_SUFFIX = ".json.gz"
+
+class ElementCache:
+
+    def __init__(self, config: RAGConfig = RAGConfig()):
+        self.config = config
+        self.cache_dir = Path(config.ELEMENT_CACHE_DIR)
+        self.max_bytes = config.ELEMENT_CACHE_MAX_MB * 1024 * 1024
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        logger.info("ElementCache initialized")
+
+    def make_key(self, file_path: str, partitioner: str) -> str:
+        return f"{FileHandler.hash_file(file_path)}_{partitioner}"
+
+    def get(self, key: str) -> List | None:
+        cache_path = self._cache_path(key)
+        try:
+            with gzip.open(cache_path, "rt", encoding="utf-8") as f:
+                elements = elements_from_dicts(json.load(f))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache entry {cache_path.name}: {str(e)}")
+            cache_path.unlink(missing_ok=True)
+            return None
+
+        # mtime doubles as the last-access time for eviction
+        os.utime(cache_path)
+        return elements
+
+    def put(self, key: str, elements: List) -> None:
+        cache_path = self._cache_path(key)
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        try:
+            with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+                json.dump(elements_to_dicts(elements), f, ensure_ascii=False, separators=(",", ":"))
+            tmp_path.replace(cache_path)
+        except Exception as e:
+            logger.warning(f"Failed to cache elements for {key}: {str(e)}")
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        self._evict()
+
+    def clear(self) -> None:
+        for entry in self._entries():
+            Path(entry.path).unlink(missing_ok=True)
+
+    def _cache_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{CACHE_SUFFIX}"
+
+    def _entries(self) -> List[os.DirEntry]:
+        return [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith(CACHE_SUFFIX)]
+
+    def _evict(self) -> None:
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_size = sum(size for _, size, _ in entries)
+        if total_size <= self.max_bytes:
+            return
+
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            Path(path).unlink(missing_ok=True)
+            total_size -= size
+            evicted += 1
+
+        logger.info(f"Evicted {evicted} element cache entries")
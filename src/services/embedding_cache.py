@@ -0,0 +1,194 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from config.logger_config import setup_logger
+from src.core.exceptions import IndexingError
+from config.config import RAGConfig
+
+logger = setup_logger(__name__)
+
+VECTORS_FILENAME = "vectors.f32"
+INDEX_FILENAME = "index.sqlite"
+INITIAL_CAPACITY = 4096
+SQLITE_BATCH_SIZE = 500
+
+def cache_model_name(config: RAGConfig) -> str:
+    # quantized ONNX vectors differ slightly from PyTorch ones and must not be mixed
+    if config.EMBEDDING_BACKEND == "onnx":
+        return f"{config.EMBEDDING_MODEL}@onnx-int8"
+    return config.EMBEDDING_MODEL
+
+class EmbeddingCache:
+
+    def __init__(self, config: RAGConfig = RAGConfig()):
+        self.config = config
+        self.cache_dir = Path(config.EMBEDDING_CACHE_DIR)
+        self.dimension = config.EMBEDDING_DIMENSION
+        self.max_entries = config.EMBEDDING_CACHE_MAX_ENTRIES
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.cache_dir / INDEX_FILENAME, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, slot INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+            self._db.commit()
+            self._open_vectors()
+        except Exception as e:
+            logger.error(f"Error opening embedding cache: {str(e)}")
+            raise IndexingError(f"Failed to open embedding cache: {str(e)}")
+
+        logger.info(f"EmbeddingCache initialized with {len(self)} entries")
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[np.ndarray | None]:
+        keys = [self.make_key(model, text) for text in texts]
+
+        with self._lock:
+            slots = self._lookup_slots(keys)
+            now = time.time()
+            self._db.executemany(
+                "UPDATE entries SET last_used = ? WHERE key = ?",
+                [(now, key) for key in keys if key in slots]
+            )
+            self._db.commit()
+            vectors = [np.array(self._vectors[slots[key]]) if key in slots else None for key in keys]
+
+        found = sum(vector is not None for vector in vectors)
+        self.hits += found
+        self.misses += len(vectors) - found
+        return vectors
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        if not texts:
+            return
+
+        keys = [self.make_key(model, text) for text in texts]
+        matrix = np.asarray(vectors, dtype=np.float32)
+
+        with self._lock:
+            existing = self._lookup_slots(keys)
+            new_keys = list(dict.fromkeys(key for key in keys if key not in existing))
+            slots = dict(existing)
+            slots.update(zip(new_keys, self._allocate_slots(len(new_keys))))
+
+            for key, vector in zip(keys, matrix):
+                self._vectors[slots[key]] = vector
+            self._vectors.flush()
+
+            now = time.time()
+            self._db.executemany(
+                "INSERT OR REPLACE INTO entries (key, model, slot, last_used) VALUES (?, ?, ?, ?)",
+                [(key, model, slots[key], now) for key in dict.fromkeys(keys)]
+            )
+            self._db.commit()
+            self._evict()
+
+    def compact(self, keep_models: List[str] | None = None) -> Dict[str, int]:
+        with self._lock:
+            removed = 0
+            if keep_models is not None:
+                placeholders = ",".join("?" * len(keep_models))
+                removed = self._db.execute(
+                    f"DELETE FROM entries WHERE model NOT IN ({placeholders})", keep_models
+                ).rowcount
+
+            rows = self._db.execute("SELECT key, slot FROM entries ORDER BY slot").fetchall()
+            capacity = max(len(rows), INITIAL_CAPACITY)
+            compacted_path = self.cache_dir / f"{VECTORS_FILENAME}.compact"
+            compacted = np.memmap(compacted_path, dtype=np.float32, mode="w+", shape=(capacity, self.dimension))
+
+            for new_slot, (_, old_slot) in enumerate(rows):
+                compacted[new_slot] = self._vectors[old_slot]
+            compacted.flush()
+            del compacted
+
+            self._db.executemany(
+                "UPDATE entries SET slot = ? WHERE key = ?",
+                [(new_slot, key) for new_slot, (key, _) in enumerate(rows)]
+            )
+            self._db.commit()
+
+            del self._vectors
+            compacted_path.replace(self.cache_dir / VECTORS_FILENAME)
+            self._open_vectors()
+            self._db.execute("VACUUM")
+
+        logger.info(f"Embedding cache compacted: {len(rows)} entries kept, {removed} removed")
+        return {"entries": len(rows), "removed": removed, "capacity": self._capacity}
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self), "capacity": self._capacity, "hits": self.hits, "misses": self.misses}
+
+    def _open_vectors(self) -> None:
+        vectors_path = self.cache_dir / VECTORS_FILENAME
+        row_bytes = self.dimension * np.dtype(np.float32).itemsize
+
+        if not vectors_path.exists() or vectors_path.stat().st_size < row_bytes:
+            with open(vectors_path, "wb") as f:
+                f.truncate(INITIAL_CAPACITY * row_bytes)
+
+        self._capacity = vectors_path.stat().st_size // row_bytes
+        self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(self._capacity, self.dimension))
+        used_slots = {slot for (slot,) in self._db.execute("SELECT slot FROM entries")}
+        self._free_slots = [slot for slot in range(self._capacity - 1, -1, -1) if slot not in used_slots]
+
+    def _grow(self, required: int) -> None:
+        vectors_path = self.cache_dir / VECTORS_FILENAME
+        row_bytes = self.dimension * np.dtype(np.float32).itemsize
+        old_capacity = self._capacity
+        new_capacity = max(old_capacity * 2, old_capacity + required)
+
+        self._vectors.flush()
+        del self._vectors
+        with open(vectors_path, "r+b") as f:
+            f.truncate(new_capacity * row_bytes)
+
+        self._capacity = new_capacity
+        self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(self._capacity, self.dimension))
+        self._free_slots = list(range(new_capacity - 1, old_capacity - 1, -1)) + self._free_slots
+
+    def _allocate_slots(self, count: int) -> List[int]:
+        if count > len(self._free_slots):
+            self._grow(count - len(self._free_slots))
+        return [self._free_slots.pop() for _ in range(count)]
+
+    def _lookup_slots(self, keys: List[str]) -> Dict[str, int]:
+        slots = {}
+        unique_keys = list(dict.fromkeys(keys))
+        for start in range(0, len(unique_keys), SQLITE_BATCH_SIZE):
+            batch = unique_keys[start:start + SQLITE_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            slots.update(self._db.execute(f"SELECT key, slot FROM entries WHERE key IN ({placeholders})", batch))
+        return slots
+
+    def _evict(self) -> None:
+        overflow = len(self) - self.max_entries
+        if overflow <= 0:
+            return
+
+        rows = self._db.execute(
+            "SELECT key, slot FROM entries ORDER BY last_used LIMIT ?", (overflow,)
+        ).fetchall()
+        self._db.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in rows])
+        self._db.commit()
+        self._free_slots.extend(slot for _, slot in rows)
+
+        logger.info(f"Evicted {len(rows)} embedding cache entries")
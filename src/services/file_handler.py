@@ -1,3 +1,4 @@
+import hashlib
 from pathlib import Path
 from typing import List, Dict
 
@@ -7,6 +8,8 @@ from config.config import RAGConfig
 
 logger = setup_logger(__name__)
 
+HASH_CHUNK_SIZE = 1024 * 1024
+
 class FileHandler:
 
     def __init__(self, config: RAGConfig = RAGConfig()):
@@ -53,3 +56,10 @@ class FileHandler:
 
         return supported_files
 
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
\ No newline at end of file
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Set
+
+from config.logger_config import setup_logger
+from src.services.context_packer import ContextPacker
+from config.config import RAGConfig
+
+logger = setup_logger(__name__)
+
+SUMMARY_PREFIX = "Zusammenfassung des bisherigen Gesprächs:\n"
+
+@dataclass
+class CompactedHistory:
+    messages: List[Dict]
+    tokens_saved: int = 0
+
+@dataclass
+class _SummaryState:
+    folded_count: int
+    folded_hash: str
+    summary: str
+    folded_tokens: int
+    summary_tokens: int
+
+class HistoryManager:
+
+    def __init__(self, config: RAGConfig, context_packer: ContextPacker,
+                 summarize: Callable[[str | None, List[Dict]], str]):
+        self.config = config
+        self.context_packer = context_packer
+        self.summarize = summarize
+        self._states: OrderedDict[str, _SummaryState] = OrderedDict()
+        self._folding: Set[str] = set()
+        self._lock = threading.Lock()
+        # summaries are written in the background so no turn waits for the summary model
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-fold")
+        self.compactions = 0
+        self.tokens_saved = 0
+        logger.info("HistoryManager initialized")
+
+    def compact(self, session_key: str | None, conversation_history: List[Dict], model: str) -> CompactedHistory:
+        history = [{"role": message["role"], "content": message["content"]} for message in conversation_history]
+        if not history:
+            return CompactedHistory(messages=[])
+
+        # without a session there is nowhere to keep a summary, so the history is only trimmed
+        state = self._get_state(session_key, history) if session_key is not None else None
+        folded = state.folded_count if state else 0
+
+        token_counts = [self.context_packer.count_tokens(model, message["content"]) for message in history]
+        if session_key is not None and sum(token_counts[folded:]) > self.config.HISTORY_TOKEN_BUDGET:
+            self._schedule_fold(session_key, history, token_counts, state, model)
+
+        # until a fold catches up, the oldest turns that do not fit are left out
+        start = folded
+        while start < len(history) and sum(token_counts[start:]) > self.config.HISTORY_TOKEN_BUDGET:
+            start += 1
+        if start < len(history) and history[start]["role"] == "assistant":
+            start += 1
+
+        tokens_saved = sum(token_counts[folded:start])
+        messages = history[start:]
+        if state is not None:
+            tokens_saved += max(state.folded_tokens - state.summary_tokens, 0)
+            messages = [{"role": "system", "content": f"{SUMMARY_PREFIX}{state.summary}"}] + messages
+
+        with self._lock:
+            self.tokens_saved += tokens_saved
+        return CompactedHistory(messages=messages, tokens_saved=tokens_saved)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"sessions": len(self._states), "compactions": self.compactions, "tokens_saved": self.tokens_saved}
+
+    def _schedule_fold(self, session_key: str, history: List[Dict], token_counts: List[int], state: _SummaryState | None,
+                       model: str) -> None:
+        with self._lock:
+            if session_key in self._folding:
+                return
+            self._folding.add(session_key)
+        self._executor.submit(self._fold, session_key, history, token_counts, state, model)
+
+    def _fold(self, session_key: str, history: List[Dict], token_counts: List[int], state: _SummaryState | None,
+              model: str) -> None:
+        try:
+            folded = state.folded_count if state else 0
+            # folding down to a fraction of the budget keeps the summary, and with it the prompt prefix, stable for several turns
+            target = self.config.HISTORY_TOKEN_BUDGET * self.config.HISTORY_FOLD_RATIO
+            new_folded = folded
+            while new_folded < len(history) and sum(token_counts[new_folded:]) > target:
+                new_folded += 1
+            if new_folded < len(history) and history[new_folded]["role"] == "assistant":
+                new_folded += 1
+
+            # each fold only summarizes the newly evicted turns on top of the previous summary
+            summary = self.summarize(state.summary if state else None, history[folded:new_folded])
+            new_state = _SummaryState(
+                folded_count=new_folded,
+                folded_hash=self._hash(history[:new_folded]),
+                summary=summary,
+                folded_tokens=sum(token_counts[:new_folded]),
+                summary_tokens=self.context_packer.count_tokens(model, summary)
+            )
+            self._put_state(session_key, new_state)
+            logger.info(
+                f"Folded {new_folded - folded} older messages into the conversation summary "
+                f"({new_state.folded_tokens} tokens -> {new_state.summary_tokens} tokens)"
+            )
+        except Exception as e:
+            # a failed summary must not fail any turn, the history is just trimmed until the next attempt
+            logger.warning(f"Could not summarize conversation history: {str(e)}")
+        finally:
+            with self._lock:
+                self._folding.discard(session_key)
+
+    def _get_state(self, session_key: str, history: List[Dict]) -> _SummaryState | None:
+        with self._lock:
+            state = self._states.get(session_key)
+        # a cleared or edited conversation no longer starts with what was summarized
+        if state is None or state.folded_count > len(history) or self._hash(history[:state.folded_count]) != state.folded_hash:
+            return None
+        return state
+
+    def _put_state(self, session_key: str, state: _SummaryState) -> None:
+        with self._lock:
+            self.compactions += 1
+            self._states[session_key] = state
+            self._states.move_to_end(session_key)
+            while len(self._states) > self.config.HISTORY_MAX_SESSIONS:
+                self._states.popitem(last=False)
+
+    def _hash(self, messages: List[Dict]) -> str:
+        return hashlib.sha1(json.dumps(messages, ensure_ascii=False).encode("utf-8")).hexdigest()
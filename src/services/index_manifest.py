@@ -0,0 +1,148 @@
+import json
+import hashlib
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List
+
+from config.logger_config import setup_logger
+from src.core.exceptions import IndexingError
+from src.services.file_handler import FileHandler
+from config.config import RAGConfig
+
+logger = setup_logger(__name__)
+
+MANIFEST_FILENAME = "manifest.json"
+
+@dataclass
+class ManifestChanges:
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    fingerprints: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.changed or self.deleted)
+
+    @property
+    def to_parse(self) -> List[str]:
+        return self.added + self.changed
+
+    @property
+    def to_remove(self) -> List[str]:
+        return self.changed + self.deleted
+
+class IndexManifest:
+
+    def __init__(self, config: RAGConfig = RAGConfig(), files: Dict[str, Dict[str, Any]] | None = None,
+                 settings: Dict[str, Any] | None = None, version: str | None = None):
+        self.config = config
+        self.files = files or {}
+        self.settings = settings or self.settings_fingerprint(config)
+        self.version = version or uuid.uuid4().hex
+
+    @staticmethod
+    def settings_fingerprint(config: RAGConfig) -> Dict[str, Any]:
+        return {
+            "embedding_model": config.EMBEDDING_MODEL,
+            "embedding_backend": config.EMBEDDING_BACKEND,
+            "embedding_dimension": config.EMBEDDING_DIMENSION,
+            "faiss_index_factory": config.FAISS_INDEX_FACTORY,
+            "docstore_backend": config.DOCSTORE_BACKEND,
+            "chunk_size": config.CHUNK_SIZE,
+            "chunk_overlap": config.CHUNK_OVERLAP,
+            "chunking_strategy": config.CHUNKING_STRATEGY,
+            "pdf_categories": list(config.PDF_CATEGORIES),
+            "language": config.LANGUAGE,
+            "language_detector": config.LANGUAGE_DETECTOR,
+            "language_min_text_length": config.LANGUAGE_MIN_TEXT_LENGTH
+        }
+
+    @classmethod
+    def load(cls, config: RAGConfig, index_dir: str) -> "IndexManifest | None":
+        manifest_path = Path(index_dir) / MANIFEST_FILENAME
+        if not manifest_path.exists():
+            return None
+
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return cls(config, files=data["files"], settings=data["settings"], version=data["version"])
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable manifest {manifest_path}: {str(e)}")
+            return None
+
+    def save(self, index_dir: str) -> None:
+        try:
+            Path(index_dir).mkdir(parents=True, exist_ok=True)
+            manifest_path = Path(index_dir) / MANIFEST_FILENAME
+            tmp_path = manifest_path.with_suffix(".tmp")
+
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": self.version, "settings": self.settings, "files": self.files}, f)
+            tmp_path.replace(manifest_path)
+
+            logger.info(f"Manifest saved with {len(self.files)} files (version {self.version})")
+
+        except Exception as e:
+            logger.error(f"Error saving manifest: {str(e)}")
+            raise IndexingError(f"Failed to save manifest: {str(e)}")
+
+    def is_compatible(self) -> bool:
+        return self.settings == self.settings_fingerprint(self.config)
+
+    def diff(self, files: List[str]) -> ManifestChanges:
+        changes = ManifestChanges()
+
+        for file_path in files:
+            previous = self.files.get(file_path)
+            fingerprint = self.fingerprint_file(file_path, previous)
+            changes.fingerprints[file_path] = fingerprint
+
+            if previous is None:
+                changes.added.append(file_path)
+            elif previous["hash"] != fingerprint["hash"]:
+                changes.changed.append(file_path)
+            else:
+                changes.unchanged.append(file_path)
+                previous.update(size=fingerprint["size"], mtime=fingerprint["mtime"])
+
+        current = set(files)
+        changes.deleted = [file_path for file_path in self.files if file_path not in current]
+
+        logger.info(
+            f"Manifest diff: {len(changes.added)} added, {len(changes.changed)} changed, "
+            f"{len(changes.deleted)} deleted, {len(changes.unchanged)} unchanged"
+        )
+        return changes
+
+    def fingerprint_file(self, file_path: str, previous: Dict[str, Any] | None = None) -> Dict[str, Any]:
+        stat = Path(file_path).stat()
+
+        # size and mtime unchanged: trust the stored hash instead of re-reading the file
+        if previous and previous["size"] == stat.st_size and previous["mtime"] == stat.st_mtime:
+            content_hash = previous["hash"]
+        else:
+            content_hash = FileHandler.hash_file(file_path)
+
+        return {"size": stat.st_size, "mtime": stat.st_mtime, "hash": content_hash}
+
+    @staticmethod
+    def document_id(file_path: str) -> str:
+        return hashlib.sha1(file_path.encode("utf-8")).hexdigest()
+
+    def record(self, file_path: str, fingerprint: Dict[str, Any], node_ids: List[str]) -> None:
+        self.files[file_path] = {**fingerprint, "doc_id": self.document_id(file_path), "node_ids": node_ids}
+
+    def remove(self, file_paths: List[str]) -> List[str]:
+        node_ids = []
+        for file_path in file_paths:
+            entry = self.files.pop(file_path, None)
+            if entry:
+                node_ids.extend(entry["node_ids"])
+        return node_ids
+
+    def bump_version(self) -> None:
+        self.version = uuid.uuid4().hex
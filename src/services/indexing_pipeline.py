@@ -0,0 +1,234 @@
+import math
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+from llama_index.core import VectorStoreIndex
+from llama_index.core.schema import BaseNode
+
+from config.logger_config import setup_logger
+from src.core.exceptions import IndexingError
+from src.services.ingestion_service import IngestionService
+from src.services.indexing_service import IndexingService, RecallEstimator
+from config.config import RAGConfig
+
+logger = setup_logger(__name__)
+
+_DONE = object()
+
+class _StageError:
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+@dataclass
+class PipelineResult:
+    node_ids: Dict[str, List[str]] = field(default_factory=dict)
+    node_count: int = 0
+    token_count: int = 0
+    recall: float | None = None
+
+class _Reservoir:
+
+    # a uniform sample of every vector written, so training sees the whole corpus and not just its first files
+    def __init__(self, size: int, dimension: int):
+        self.size = size
+        self.seen = 0
+        self._vectors = np.empty((size, dimension), dtype=np.float32)
+        self._rng = np.random.default_rng(0)
+
+    def add(self, vectors: np.ndarray) -> None:
+        for vector in vectors:
+            if self.seen < self.size:
+                self._vectors[self.seen] = vector
+            else:
+                slot = self._rng.integers(0, self.seen + 1)
+                if slot < self.size:
+                    self._vectors[slot] = vector
+            self.seen += 1
+
+    def sample(self) -> np.ndarray:
+        return self._vectors[:min(self.seen, self.size)]
+
+@dataclass
+class _WriterState:
+    buffer_target: int
+    evaluate_recall: bool
+    pending: List[BaseNode] = field(default_factory=list)
+    recall_estimator: RecallEstimator | None = None
+    untrained_index: Any = None
+    train_sample: _Reservoir | None = None
+
+class IndexingPipeline:
+
+    def __init__(self, config: RAGConfig, ingestion_service: IngestionService, indexing_service: IndexingService):
+        self.config = config
+        self.ingestion_service = ingestion_service
+        self.indexing_service = indexing_service
+        logger.info("IndexingPipeline initialized")
+
+    def run(self, index: VectorStoreIndex, files: List[str], evaluate_recall: bool = False) -> PipelineResult:
+        logger.info(f"Streaming {len(files)} files into the index")
+
+        parsed_queue: queue.Queue = queue.Queue(maxsize=self.config.PIPELINE_QUEUE_SIZE)
+        chunked_queue: queue.Queue = queue.Queue(maxsize=self.config.PIPELINE_QUEUE_SIZE)
+        stop = threading.Event()
+        result = PipelineResult()
+        state = self._create_writer_state(index, evaluate_recall)
+
+        stages = [
+            threading.Thread(
+                target=self._produce,
+                args=(self.ingestion_service.parse_files(files), parsed_queue, stop),
+                name="pipeline-parse",
+                daemon=True
+            ),
+            threading.Thread(
+                target=self._produce,
+                args=(self._chunk(self._consume(parsed_queue, stop), result), chunked_queue, stop),
+                name="pipeline-chunk",
+                daemon=True
+            )
+        ]
+        for stage in stages:
+            stage.start()
+
+        try:
+            batch: List[BaseNode] = []
+            for file_path, nodes in self._consume(chunked_queue, stop):
+                result.node_ids[file_path] = [node.node_id for node in nodes]
+                batch.extend(nodes)
+
+                if len(batch) >= self.config.EMBED_BATCH_SIZE:
+                    self._index_batch(index, batch, result, state)
+                    batch = []
+
+            if batch:
+                self._index_batch(index, batch, result, state)
+            self._flush_pending(index, result, state)
+            if state.untrained_index is not None:
+                self.indexing_service.train_staged_index(index, state.untrained_index, state.train_sample.sample())
+
+            if state.recall_estimator is not None:
+                result.recall = state.recall_estimator.recall(index.vector_store.client)
+                logger.info(
+                    f"Recall@{self.config.FAISS_RECALL_K} of '{self.config.FAISS_INDEX_FACTORY}' "
+                    f"against exact search: {result.recall:.3f}"
+                )
+
+        except Exception as e:
+            logger.error(f"Indexing pipeline failed: {str(e)}")
+            raise IndexingError(f"Indexing pipeline failed: {str(e)}")
+
+        finally:
+            stop.set()
+            for stage in stages:
+                stage.join()
+
+        logger.info(
+            f"Pipeline finished: {len(result.node_ids)} files, {result.node_count} nodes, "
+            f"{result.token_count} tokens"
+        )
+        return result
+
+    def _chunk(self, parsed_files: Iterator[Tuple[str, str]], result: PipelineResult) -> Iterator[Tuple[str, List[BaseNode]]]:
+        for file_path, content in parsed_files:
+            document = self.indexing_service.create_document(file_path, content)
+            result.token_count += self.indexing_service.count_tokens([document])
+            yield file_path, self.indexing_service.split_documents([document])
+
+    def _create_writer_state(self, index: VectorStoreIndex, evaluate_recall: bool) -> _WriterState:
+        evaluate_recall = evaluate_recall and not self.indexing_service.is_exact_index()
+        # recall queries are drawn from the first nodes, enough of them that the queries stay a small fraction
+        buffer_target = math.ceil(self.config.FAISS_RECALL_QUERIES / self.config.FAISS_RECALL_MAX_FRACTION) if evaluate_recall else 0
+        state = _WriterState(buffer_target=buffer_target, evaluate_recall=evaluate_recall)
+
+        if self.indexing_service.needs_training(index):
+            state.untrained_index = self.indexing_service.stage_untrained_index(index)
+            state.train_sample = _Reservoir(self.config.FAISS_TRAIN_SAMPLE_SIZE, self.config.EMBEDDING_DIMENSION)
+        return state
+
+    def _index_batch(self, index: VectorStoreIndex, nodes: List[BaseNode], result: PipelineResult, state: _WriterState) -> None:
+        self.indexing_service.embed_nodes(nodes)
+
+        # recall queries are chosen before the first vector is added
+        if state.buffer_target:
+            state.pending.extend(nodes)
+            if len(state.pending) >= state.buffer_target:
+                self._flush_pending(index, result, state)
+            return
+
+        self._insert(index, nodes, result, state)
+
+    def _flush_pending(self, index: VectorStoreIndex, result: PipelineResult, state: _WriterState) -> None:
+        if not state.pending:
+            return
+
+        nodes, state.pending = state.pending, []
+        state.buffer_target = 0
+
+        held_out = np.zeros(len(nodes), dtype=bool)
+        if state.evaluate_recall:
+            query_count = min(self.config.FAISS_RECALL_QUERIES, int(len(nodes) * self.config.FAISS_RECALL_MAX_FRACTION))
+            if query_count:
+                vectors = np.array([node.get_embedding() for node in nodes], dtype=np.float32)
+                held_out[np.random.default_rng(0).choice(len(nodes), size=query_count, replace=False)] = True
+                state.recall_estimator = RecallEstimator(vectors[held_out], self.config.FAISS_RECALL_K)
+
+        self._insert(index, nodes, result, state, held_out)
+        if state.recall_estimator is not None:
+            state.recall_estimator.query_ids = self.indexing_service.get_faiss_ids(
+                index, [node for node, is_query in zip(nodes, held_out) if is_query]
+            )
+
+    def _insert(self, index: VectorStoreIndex, nodes: List[BaseNode], result: PipelineResult, state: _WriterState,
+                held_out: np.ndarray | None = None) -> None:
+        self.indexing_service.insert_nodes(index, nodes)
+
+        if state.recall_estimator is not None or state.train_sample is not None:
+            vectors = np.array([node.get_embedding() for node in nodes], dtype=np.float32)
+            if state.recall_estimator is not None:
+                state.recall_estimator.add(vectors, self.indexing_service.get_faiss_ids(index, nodes))
+            if state.train_sample is not None:
+                # the recall queries stay out of the training sample
+                state.train_sample.add(vectors if held_out is None else vectors[~held_out])
+
+        result.node_count += len(nodes)
+        logger.info(f"Indexed {result.node_count} nodes from {len(result.node_ids)} files")
+
+    def _produce(self, items: Iterator, output: queue.Queue, stop: threading.Event) -> None:
+        try:
+            for item in items:
+                if not self._put(output, item, stop):
+                    return
+            self._put(output, _DONE, stop)
+        except BaseException as e:
+            self._put(output, _StageError(e), stop)
+        finally:
+            # runs the generator's cleanup, e.g. shutting down the parse process pool
+            close = getattr(items, "close", None)
+            if close is not None:
+                close()
+
+    def _put(self, output: queue.Queue, item, stop: threading.Event) -> bool:
+        while not stop.is_set():
+            try:
+                output.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _consume(self, input_queue: queue.Queue, stop: threading.Event) -> Iterator:
+        while not stop.is_set():
+            try:
+                item = input_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                return
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
@@ -1,66 +1,336 @@
-from typing import List
+from typing import Any, List
 from llama_index.core import Document, VectorStoreIndex, Settings, StorageContext
 from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import BaseNode, MetadataMode
+from llama_index.core.storage.docstore.keyval_docstore import KVDocumentStore
 from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.vector_stores.faiss import FaissMapVectorStore
 import faiss
+import json
+import numpy as np
 from pathlib import Path
 from transformers import AutoTokenizer
 
 from config.logger_config import setup_logger
 from src.core.exceptions import IndexingError
+from src.services.index_manifest import IndexManifest
+from src.services.embedding_cache import EmbeddingCache, cache_model_name
+from src.services.onnx_embedding import load_onnx_embedding
+from src.services.section_splitter import SectionSplitter
+from src.services.sqlite_kvstore import DOCSTORE_FILENAME, SQLiteKVStore
 from config.config import RAGConfig
 
 logger = setup_logger(__name__)
 
+VECTOR_STORE_FILENAME = "default__vector_store.json"
+ID_MAP_FILENAME = "faiss_id_map.json"
+STAGED_MOVE_BATCH_SIZE = 65536
+
+def is_ivf_index(faiss_index) -> bool:
+    # also looks through the IndexIDMap2 wrapper
+    return faiss.try_extract_index_ivf(faiss_index) is not None
+
+class IncrementalFaissMapVectorStore(FaissMapVectorStore):
+
+    # FaissMapVectorStore derives new ids from ntotal, which shrinks after deletions
+    # and then collides with ids still in the IndexIDMap2, so allocate past the largest id
+    def add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        if not nodes:
+            return []
+
+        next_id = max(self._faiss_id_to_node_id_map, default=-1) + 1
+        faiss_ids = np.arange(next_id, next_id + len(nodes), dtype=np.int64)
+        embeddings = np.array([node.get_embedding() for node in nodes], dtype="float32")
+
+        self._faiss_index.add_with_ids(embeddings, faiss_ids)
+
+        for node, faiss_id in zip(nodes, faiss_ids.tolist()):
+            self._node_id_to_faiss_id_map[node.id_] = faiss_id
+            self._faiss_id_to_node_id_map[faiss_id] = node.id_
+
+        return [node.id_ for node in nodes]
+
+    def persist(self, persist_path: str = VECTOR_STORE_FILENAME, fs: Any = None) -> None:
+        super().persist(persist_path=persist_path, fs=fs)
+
+        id_map = {"faiss_id_to_node_id": {str(k): v for k, v in self._faiss_id_to_node_id_map.items()}}
+        with open(Path(persist_path).parent / ID_MAP_FILENAME, "w", encoding="utf-8") as f:
+            json.dump(id_map, f)
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir: str, mmap: bool = False, fs: Any = None) -> "IncrementalFaissMapVectorStore":
+        id_map_path = Path(persist_dir) / ID_MAP_FILENAME
+        if not id_map_path.exists():
+            # index persisted before this store wrote its own id map
+            return cls.from_map_store(FaissMapVectorStore.from_persist_dir(persist_dir))
+
+        index_path = str(Path(persist_dir) / VECTOR_STORE_FILENAME)
+        faiss_index = None
+        if mmap:
+            try:
+                flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+                faiss_index = faiss.read_index(index_path, flags)
+            except Exception as e:
+                logger.warning(f"Memory-mapping not supported for this index, reading it fully: {str(e)}")
+            # faiss only maps the inverted lists of IVF indexes, anything else is read into memory regardless
+            if faiss_index is not None and not is_ivf_index(faiss_index):
+                logger.warning("Memory-mapping only applies to IVF indexes, the index was read into memory instead")
+        if faiss_index is None:
+            faiss_index = faiss.read_index(index_path)
+
+        with open(id_map_path, "r", encoding="utf-8") as f:
+            id_map = json.load(f)
+
+        vector_store = cls(faiss_index=faiss_index)
+        vector_store._faiss_id_to_node_id_map = {int(k): v for k, v in id_map["faiss_id_to_node_id"].items()}
+        vector_store._node_id_to_faiss_id_map = {v: k for k, v in vector_store._faiss_id_to_node_id_map.items()}
+        return vector_store
+
+    @classmethod
+    def from_map_store(cls, map_store: FaissMapVectorStore) -> "IncrementalFaissMapVectorStore":
+        vector_store = cls(faiss_index=map_store._faiss_index)
+        # the persisted id map is JSON, which turns the integer FAISS ids into strings
+        vector_store._faiss_id_to_node_id_map = {int(k): v for k, v in map_store._faiss_id_to_node_id_map.items()}
+        vector_store._node_id_to_faiss_id_map = {k: int(v) for k, v in map_store._node_id_to_faiss_id_map.items()}
+        return vector_store
+
+class RecallEstimator:
+
+    def __init__(self, queries: np.ndarray, k: int):
+        self.queries = np.ascontiguousarray(queries, dtype=np.float32)
+        self.k = k
+        self.query_ids = np.full(len(self.queries), -1, dtype=np.int64)
+        self._query_norms = (self.queries ** 2).sum(axis=1)[:, np.newaxis]
+        # exact neighbours are accumulated batch by batch, so no flat copy of the corpus is needed,
+        # one extra neighbour leaves room for the query's own vector once it is dropped
+        self._exact = faiss.ResultHeap(len(self.queries), k + 1)
+
+    def add(self, vectors: np.ndarray, faiss_ids: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        distances = self._query_norms + (vectors ** 2).sum(axis=1)[np.newaxis, :] - 2 * self.queries @ vectors.T
+        ids = np.broadcast_to(faiss_ids, distances.shape)
+        self._exact.add_result(np.ascontiguousarray(distances, dtype=np.float32), np.ascontiguousarray(ids, dtype=np.int64))
+
+    def recall(self, faiss_index) -> float:
+        self._exact.finalize()
+        _, approximate = faiss_index.search(self.queries, self.k + 1)
+
+        hits = 0
+        total = 0
+        for query_id, exact_row, approximate_row in zip(self.query_ids.tolist(), self._exact.I, approximate):
+            # the queries are indexed as well, finding themselves would count as a free hit
+            expected = set(self._neighbours(exact_row, query_id))
+            hits += len(expected & set(self._neighbours(approximate_row, query_id)))
+            total += len(expected)
+        return hits / total if total else 1.0
+
+    def _neighbours(self, row: np.ndarray, query_id: int) -> List[int]:
+        return [faiss_id for faiss_id in row.tolist() if faiss_id >= 0 and faiss_id != query_id][:self.k]
+
 class IndexingService:
 
     def __init__(self, config: RAGConfig = RAGConfig()):
         self.config = config
+        self._tokenizer = None
+        self.embedding_cache = EmbeddingCache(config) if config.EMBEDDING_CACHE_ENABLED else None
         self._setup_models()
         logger.info("IndexingService initialized")
 
     def _setup_models(self):
-        self.embed_model = HuggingFaceEmbedding(model_name=self.config.EMBEDDING_MODEL)
-        self.text_splitter = SentenceSplitter(
-            chunk_size=self.config.CHUNK_SIZE,
-            chunk_overlap=self.config.CHUNK_OVERLAP
-        )
+        self.embed_model = self._create_embed_model()
+        self.text_splitter = self._create_text_splitter()
         Settings.embed_model = self.embed_model
         Settings.text_splitter = self.text_splitter
 
-    def create_documents(self, content_list: List[str]) -> List[Document]:
+    def _create_text_splitter(self) -> SentenceSplitter:
+        strategy = self.config.CHUNKING_STRATEGY
+        logger.info(f"Chunking documents with {strategy} strategy")
+
+        if strategy == "section":
+            return SectionSplitter(chunk_size=self.config.CHUNK_SIZE, chunk_overlap=self.config.CHUNK_OVERLAP)
+        if strategy == "sentence":
+            return SentenceSplitter(chunk_size=self.config.CHUNK_SIZE, chunk_overlap=self.config.CHUNK_OVERLAP)
+        raise IndexingError(f"Unsupported chunking strategy: {strategy}")
+
+    def _create_embed_model(self) -> BaseEmbedding:
+        backend = self.config.EMBEDDING_BACKEND
+        logger.info(f"Loading {self.config.EMBEDDING_MODEL} with {backend} backend")
+
+        if backend == "onnx":
+            return load_onnx_embedding(self.config)
+        if backend == "torch":
+            return HuggingFaceEmbedding(
+                model_name=self.config.EMBEDDING_MODEL,
+                embed_batch_size=self.config.EMBED_BATCH_SIZE
+            )
+        raise IndexingError(f"Unsupported embedding backend: {backend}")
+
+    def create_document(self, file_path: str, content: str) -> Document:
+        return Document(
+            id_=IndexManifest.document_id(file_path),
+            text=content,
+            metadata={"file_path": file_path},
+            excluded_embed_metadata_keys=["file_path"],
+            excluded_llm_metadata_keys=["file_path"]
+        )
+
+    def split_documents(self, documents: List[Document]) -> List[BaseNode]:
+        try:
+            return self.text_splitter.get_nodes_from_documents(documents)
+        except Exception as e:
+            logger.error(f"Error splitting documents: {str(e)}")
+            raise IndexingError(f"Failed to split documents: {str(e)}")
+
+    def embed_nodes(self, nodes: List[BaseNode]) -> None:
         try:
-            documents = [Document(text=content) for content in content_list]
-            logger.info(f"Created {len(documents)} documents")
-            return documents
+            texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+            embeddings = self._embed_texts(texts)
+            for node, embedding in zip(nodes, embeddings):
+                node.embedding = embedding
         except Exception as e:
-            logger.error(f"Error creating documents: {str(e)}")
-            raise IndexingError(f"Failed to create documents: {str(e)}")
+            logger.error(f"Error embedding nodes: {str(e)}")
+            raise IndexingError(f"Failed to embed nodes: {str(e)}")
+        
+    def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        if self.embedding_cache is None:
+            return self.embed_model.get_text_embedding_batch(texts)
+
+        model_name = cache_model_name(self.config)
+        cached = self.embedding_cache.get_many(model_name, texts)
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            new_embeddings = self.embed_model.get_text_embedding_batch(missing_texts)
+            self.embedding_cache.put_many(model_name, missing_texts, new_embeddings)
+            for i, embedding in zip(missing, new_embeddings):
+                cached[i] = embedding
+
+        logger.debug(f"Embedding cache: {len(texts) - len(missing)}/{len(texts)} hits")
+        return [list(map(float, vector)) for vector in cached]
         
-    def create_faiss_index(self, documents: List[Document]) -> VectorStoreIndex:
+    def create_faiss_index(self, persist_dir: str) -> VectorStoreIndex:
         try:
-            logger.info(f"Creating FAISS index for {len(documents)} documents")
+            logger.info(f"Creating FAISS index '{self.config.FAISS_INDEX_FACTORY}'")
             
-            faiss_index = faiss.IndexFlatL2(self.config.EMBEDDING_DIMENSION)
+            faiss_index = faiss.index_factory(self.config.EMBEDDING_DIMENSION, self.config.FAISS_INDEX_FACTORY, faiss.METRIC_L2)
             id_map_index = faiss.IndexIDMap2(faiss_index)
-            vector_store = FaissMapVectorStore(faiss_index=id_map_index)
-            storage_context = StorageContext.from_defaults(vector_store=vector_store)
+            self.enable_reconstruction(id_map_index)
+            self.apply_search_params(id_map_index)
+            vector_store = IncrementalFaissMapVectorStore(faiss_index=id_map_index)
+            storage_context = StorageContext.from_defaults(
+                vector_store=vector_store,
+                docstore=self._open_docstore(persist_dir, reset=True)
+            )
 
-            index = VectorStoreIndex.from_documents(
-                documents=documents,
+            index = VectorStoreIndex(
+                nodes=[],
                 storage_context=storage_context,
-                transformations=[self.text_splitter],
-                show_progress=True
+                embed_model=self.embed_model
             )
             
             logger.info("FAISS index created successfully")
-            logger.info(f"Token count: {self.__count_tokens(documents)}")
             return index
             
         except Exception as e:
             logger.error(f"Error creating FAISS index: {str(e)}")
             raise IndexingError(f"Failed to create FAISS index: {str(e)}")
+
+    def _open_docstore(self, docstore_dir: str, reset: bool = False) -> KVDocumentStore | None:
+        # None lets the StorageContext fall back to the in-memory JSON docstore
+        if self.config.DOCSTORE_BACKEND == "json":
+            return None
+        if self.config.DOCSTORE_BACKEND == "sqlite":
+            db_path = Path(docstore_dir) / DOCSTORE_FILENAME
+            if not reset and not db_path.exists():
+                logger.warning(f"No {DOCSTORE_FILENAME} in {docstore_dir}, falling back to the JSON docstore")
+                return None
+            return KVDocumentStore(SQLiteKVStore(str(db_path), reset=reset))
+        raise IndexingError(f"Unsupported docstore backend: {self.config.DOCSTORE_BACKEND}")
+
+    def apply_search_params(self, faiss_index) -> None:
+        if self.config.FAISS_SEARCH_PARAMS:
+            faiss.ParameterSpace().set_index_parameters(faiss_index, self.config.FAISS_SEARCH_PARAMS)
+            logger.info(f"Applied FAISS search parameters: {self.config.FAISS_SEARCH_PARAMS}")
+
+    def enable_reconstruction(self, faiss_index) -> None:
+        # IVF indexes only hand stored vectors back to the retrieval postprocessor through a direct map
+        ivf_index = faiss.try_extract_index_ivf(faiss_index)
+        if ivf_index is not None and ivf_index.direct_map.type == faiss.DirectMap.NoMap:
+            ivf_index.make_direct_map()
+            logger.info("Enabled vector reconstruction for the IVF index")
+
+    def is_exact_index(self) -> bool:
+        return self.config.FAISS_INDEX_FACTORY.strip() == "Flat"
+
+    def supports_removal(self) -> bool:
+        # HNSW graphs cannot drop vectors and IVF lists keep their ids while IndexIDMap2 renumbers,
+        # which the direct map rejects as well, so changed or deleted files need a full rebuild
+        return "HNSW" not in self.config.FAISS_INDEX_FACTORY and "IVF" not in self.config.FAISS_INDEX_FACTORY
+
+    def needs_training(self, index: VectorStoreIndex) -> bool:
+        return not index.vector_store.client.is_trained
+
+    def stage_untrained_index(self, index: VectorStoreIndex):
+        # until the training sample is complete, vectors go into an exact index so nodes are written as they arrive
+        untrained_index = index.vector_store.client
+        index.vector_store._faiss_index = faiss.IndexIDMap2(faiss.IndexFlatL2(self.config.EMBEDDING_DIMENSION))
+        logger.info("Staging vectors in a flat index until the FAISS index is trained")
+        return untrained_index
+
+    def train_staged_index(self, index: VectorStoreIndex, untrained_index, vectors: np.ndarray) -> None:
+        ivf_index = faiss.try_extract_index_ivf(untrained_index)
+        if ivf_index is not None and len(vectors) < ivf_index.nlist:
+            raise IndexingError(
+                f"'{self.config.FAISS_INDEX_FACTORY}' needs at least {ivf_index.nlist} chunks to train its lists, "
+                f"the corpus has {len(vectors)}; use fewer lists or the 'Flat' factory"
+            )
+
+        try:
+            logger.info(f"Training FAISS index on {len(vectors)} vectors")
+            untrained_index.train(np.ascontiguousarray(vectors, dtype=np.float32))
+
+            staged_index = index.vector_store.client
+            faiss_ids = faiss.vector_to_array(staged_index.id_map)
+            for start in range(0, len(faiss_ids), STAGED_MOVE_BATCH_SIZE):
+                end = min(start + STAGED_MOVE_BATCH_SIZE, len(faiss_ids))
+                untrained_index.add_with_ids(staged_index.index.reconstruct_n(start, end - start), faiss_ids[start:end])
+
+            index.vector_store._faiss_index = untrained_index
+            self.enable_reconstruction(untrained_index)
+            logger.info(f"Moved {len(faiss_ids)} staged vectors into the trained index")
+        except Exception as e:
+            logger.error(f"Error training FAISS index: {str(e)}")
+            raise IndexingError(f"Failed to train FAISS index: {str(e)}")
+
+    def get_faiss_ids(self, index: VectorStoreIndex, nodes: List[BaseNode]) -> np.ndarray:
+        id_map = index.vector_store._node_id_to_faiss_id_map
+        return np.array([id_map[node.node_id] for node in nodes], dtype=np.int64)
+
+    def insert_nodes(self, index: VectorStoreIndex, nodes: List[BaseNode]) -> None:
+        try:
+            logger.debug(f"Inserting {len(nodes)} nodes into FAISS index")
+            index.insert_nodes(nodes)
+        except Exception as e:
+            logger.error(f"Error inserting nodes: {str(e)}")
+            raise IndexingError(f"Failed to insert nodes: {str(e)}")
+
+    def delete_nodes(self, index: VectorStoreIndex, node_ids: List[str]) -> None:
+        if not node_ids:
+            return
+        try:
+            logger.info(f"Removing {len(node_ids)} nodes from FAISS index")
+            index.vector_store.delete_nodes(node_ids)
+
+            for node_id in node_ids:
+                index.index_struct.delete(node_id)
+                index.docstore.delete_document(node_id, raise_error=False)
+
+            index.storage_context.index_store.add_index_struct(index.index_struct)
+        except Exception as e:
+            logger.error(f"Error removing nodes: {str(e)}")
+            raise IndexingError(f"Failed to remove nodes: {str(e)}")
         
     def save_index(self, index: VectorStoreIndex, persist_dir: str) -> None:
         try:
@@ -75,18 +345,22 @@ class IndexingService:
             logger.error(f"Error saving index: {str(e)}")
             raise IndexingError(f"Failed to save index: {str(e)}")
         
-    def load_index(self, persist_dir: str):
+    def load_index(self, persist_dir: str, mmap: bool | None = None, docstore_dir: str | None = None):
         try:
             load_dir = persist_dir or self.config.INDEX_DIR
+            use_mmap = self.config.INDEX_LOAD_MODE == "mmap" if mmap is None else mmap
             
             if not Path(load_dir).exists():
                 raise IndexingError(f"Index directory does not exist: {load_dir}")
             
             logger.info(f"Loading index from {load_dir}")
             
-            vector_store = FaissMapVectorStore.from_persist_dir(load_dir)
+            vector_store = IncrementalFaissMapVectorStore.from_persist_dir(load_dir, mmap=use_mmap)
+            self.enable_reconstruction(vector_store.client)
+            self.apply_search_params(vector_store.client)
             storage_context = StorageContext.from_defaults(
                 vector_store=vector_store, 
+                docstore=self._open_docstore(docstore_dir or load_dir),
                 persist_dir=load_dir
             )
             
@@ -96,13 +370,15 @@ class IndexingService:
                 embed_model=self.embed_model
             )
             
-            logger.info("Index loaded successfully")
+            memory_mapped = use_mmap and is_ivf_index(vector_store.client)
+            logger.info(f"Index loaded successfully ({'mmap' if memory_mapped else 'memory'})")
             return index, vector_store, storage_context.docstore
             
         except Exception as e:
             logger.error(f"Error loading index: {str(e)}")
             raise IndexingError(f"Failed to load index: {str(e)}")
         
-    def __count_tokens(self, documents: List[Document]) -> int:
-        tokenizer = AutoTokenizer.from_pretrained(self.config.EMBEDDING_MODEL)
-        return sum(len(tokenizer.encode(doc.text, add_special_tokens=False)) for doc in documents)
\ No newline at end of file
+    def count_tokens(self, documents: List[Document]) -> int:
+        if self._tokenizer is None:
+            self._tokenizer = AutoTokenizer.from_pretrained(self.config.EMBEDDING_MODEL)
+        return sum(len(self._tokenizer.encode(doc.text, add_special_tokens=False)) for doc in documents)
\ No newline at end of file
@@ -0,0 +1,102 @@
+import os
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterator, List, Tuple
+
+from config.logger_config import setup_logger
+from src.services.document_processor import DocumentProcessor
+from config.config import RAGConfig
+
+logger = setup_logger(__name__)
+
+_worker_processor: DocumentProcessor | None = None
+
+def _init_worker(config: RAGConfig) -> None:
+    global _worker_processor
+    _worker_processor = DocumentProcessor(config)
+
+def _process_in_worker(file_path: str) -> str:
+    return _worker_processor.process_file(file_path)
+
+class IngestionService:
+
+    def __init__(self, config: RAGConfig = RAGConfig(), document_processor: DocumentProcessor | None = None):
+        self.config = config
+        self.document_processor = document_processor or DocumentProcessor(config)
+        logger.info("IngestionService initialized")
+
+    def get_worker_count(self) -> int:
+        workers = self.config.INGESTION_WORKERS
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        return workers
+
+    def parse_files(self, files: List[str]) -> Iterator[Tuple[str, str]]:
+        workers = min(self.get_worker_count(), max(len(files), 1))
+
+        if workers <= 1:
+            yield from self._parse_sequential(files)
+        else:
+            yield from self._parse_parallel(files, workers)
+
+    def _parse_sequential(self, files: List[str]) -> Iterator[Tuple[str, str]]:
+        total_files = len(files)
+        processed_count = 0
+        failed_count = 0
+
+        for file_path in files:
+            try:
+                content = self.document_processor.process_file(file_path)
+            except Exception as e:
+                failed_count += 1
+                logger.warning(f"Failed to process {file_path}: {str(e)}")
+                continue
+
+            processed_count += 1
+            logger.info(f"Processed {processed_count}/{total_files} ({failed_count} failed): {file_path}")
+            yield file_path, content
+
+    def _parse_parallel(self, files: List[str], workers: int) -> Iterator[Tuple[str, str]]:
+        total_files = len(files)
+        processed_count = 0
+        failed_count = 0
+
+        logger.info(f"Parsing {total_files} files with {workers} worker processes")
+
+        # spawn instead of fork: the parent already holds torch/tokenizer thread pools
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.config,)
+        ) as executor:
+            # keep only a few files in flight so parsed content never piles up in memory
+            pending_files = iter(files)
+            futures = {}
+
+            def submit_next() -> None:
+                file_path = next(pending_files, None)
+                if file_path is not None:
+                    futures[executor.submit(_process_in_worker, file_path)] = file_path
+
+            for _ in range(workers * 2):
+                submit_next()
+
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    file_path = futures.pop(future)
+                    submit_next()
+
+                    try:
+                        content = future.result()
+                    except Exception as e:
+                        failed_count += 1
+                        logger.warning(f"Failed to process {file_path}: {str(e)}")
+                        continue
+
+                    processed_count += 1
+                    logger.info(f"Processed {processed_count}/{total_files} ({failed_count} failed): {file_path}")
+                    yield file_path, content
@@ -0,0 +1,124 @@
+from collections import OrderedDict
+from typing import List
+
+from config.logger_config import setup_logger
+from src.core.exceptions import FileProcessingError
+from config.config import RAGConfig
+
+logger = setup_logger(__name__)
+
+class LangdetectBackend:
+
+    def __init__(self, config: RAGConfig):
+        from langdetect import DetectorFactory, detect
+
+        # langdetect is randomised unless seeded, which makes builds non-reproducible
+        DetectorFactory.seed = 0
+        self._detect = detect
+
+    def detect_batch(self, texts: List[str]) -> List[str | None]:
+        languages = []
+        for text in texts:
+            try:
+                languages.append(self._detect(text))
+            except Exception:
+                languages.append(None)
+        return languages
+
+class FastTextBackend:
+
+    def __init__(self, config: RAGConfig):
+        if not config.LANGUAGE_DETECTOR_MODEL_PATH:
+            raise FileProcessingError("LANGUAGE_DETECTOR_MODEL_PATH must point to a fastText lid model")
+        try:
+            import fasttext
+        except ImportError:
+            raise FileProcessingError("The fasttext language detector requires the 'fasttext' package")
+
+        self._model = fasttext.load_model(config.LANGUAGE_DETECTOR_MODEL_PATH)
+
+    def detect_batch(self, texts: List[str]) -> List[str | None]:
+        labels, _ = self._model.predict([text.replace("\n", " ") for text in texts], k=1)
+        return [label[0].replace("__label__", "") if label else None for label in labels]
+
+DETECTOR_BACKENDS = {
+    "langdetect": LangdetectBackend,
+    "fasttext": FastTextBackend
+}
+
+class LanguageFilter:
+
+    def __init__(self, config: RAGConfig = RAGConfig()):
+        self.config = config
+        backend = DETECTOR_BACKENDS.get(config.LANGUAGE_DETECTOR)
+        if backend is None:
+            raise FileProcessingError(f"Unsupported language detector: {config.LANGUAGE_DETECTOR}")
+        self.backend = backend(config)
+        self._cache: OrderedDict[str, str | None] = OrderedDict()
+        logger.info(f"LanguageFilter initialized with {config.LANGUAGE_DETECTOR} backend")
+
+    def filter(self, elements: List, target_language: str) -> List:
+        texts = [(element.text or "").strip() for element in elements]
+        is_short = [len(text) < self.config.LANGUAGE_MIN_TEXT_LENGTH for text in texts]
+
+        languages: List[str | None] = [None] * len(elements)
+        long_texts = [text for text, short in zip(texts, is_short) if not short]
+        detected = self._detect_all(long_texts)
+        for i, text in enumerate(texts):
+            if not is_short[i]:
+                languages[i] = detected[text]
+
+        # short texts and detection failures take the language of their section
+        unresolved = [i for i, language in enumerate(languages) if language is None]
+        fallback_texts = []
+        for i in unresolved:
+            languages[i] = self._section_language(elements, languages, is_short, i)
+            if languages[i] is None and texts[i]:
+                fallback_texts.append(texts[i])
+
+        if fallback_texts:
+            detected = self._detect_all(fallback_texts)
+            for i in unresolved:
+                if languages[i] is None and texts[i]:
+                    languages[i] = detected[texts[i]]
+
+        filtered_elements = [element for element, language in zip(elements, languages) if language == target_language]
+        logger.debug(f"Language filtering: {len(filtered_elements)}/{len(elements)} elements kept")
+        return filtered_elements
+
+    def _section_language(self, elements: List, languages: List[str | None], is_short: List[bool], i: int) -> str | None:
+        # titles introduce the following section, all other elements belong to the preceding one
+        if elements[i].category == "Title":
+            directions = (range(i + 1, len(elements)), range(i - 1, -1, -1))
+        else:
+            directions = (range(i - 1, -1, -1), range(i + 1, len(elements)))
+
+        for direction in directions:
+            for j in direction:
+                if not is_short[j] and languages[j] is not None:
+                    return languages[j]
+        return None
+
+    def _detect_all(self, texts: List[str]) -> dict:
+        results = {}
+        pending = []
+        for text in dict.fromkeys(texts):
+            if text in self._cache:
+                self._cache.move_to_end(text)
+                results[text] = self._cache[text]
+            else:
+                pending.append(text)
+
+        batch_size = self.config.LANGUAGE_DETECTION_BATCH_SIZE
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            for text, language in zip(batch, self.backend.detect_batch(batch)):
+                results[text] = language
+                self._remember(text, language)
+
+        return results
+
+    def _remember(self, text: str, language: str | None) -> None:
+        self._cache[text] = language
+        if len(self._cache) > self.config.LANGUAGE_CACHE_SIZE:
+            self._cache.popitem(last=False)
@@ -0,0 +1,214 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Tuple
+
+from config.logger_config import setup_logger
+from src.core.exceptions import LLMOverloadedError
+from config.config import RAGConfig
+
+logger = setup_logger(__name__)
+
+class Priority(IntEnum):
+    CHAT = 0
+    QUIZ = 1
+
+@dataclass
+class Admission:
+    requested_model: str
+    model: str
+    priority: Priority
+    queue_wait: float = 0.0
+    generation_time: float = 0.0
+
+    @property
+    def degraded(self) -> bool:
+        return self.model != self.requested_model
+
+@dataclass(order=True)
+class _Ticket:
+    priority: int
+    sequence: int
+    model: str = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    notify: Callable[[], None] = field(compare=False)
+    granted: bool = field(default=False, compare=False)
+    cancelled: bool = field(default=False, compare=False)
+
+@dataclass
+class _ModelStats:
+    active: int = 0
+    queued: int = 0
+    completed: int = 0
+    shed: int = 0
+    degraded: int = 0
+    total_queue_wait: float = 0.0
+    total_generation_time: float = 0.0
+
+class LLMScheduler:
+
+    def __init__(self, config: RAGConfig = RAGConfig()):
+        self.config = config
+        self._lock = threading.Lock()
+        self._queues: Dict[str, List[_Ticket]] = {}
+        self._stats: Dict[str, _ModelStats] = {}
+        self._sequence = itertools.count()
+        logger.info("LLMScheduler initialized")
+
+    @contextmanager
+    def slot(self, model: str, priority: Priority) -> Iterator[Admission]:
+        admission, ticket = self._admit(model, priority)
+        granted = threading.Event()
+        ticket.notify = granted.set
+
+        if not self._enqueue(ticket):
+            if not granted.wait(self.config.LLM_QUEUE_TIMEOUT_SECONDS) and self._withdraw(ticket):
+                raise self._shed(admission, "queue wait timed out")
+
+        start = time.perf_counter()
+        admission.queue_wait = start - ticket.enqueued_at
+        try:
+            yield admission
+        finally:
+            self._finish(admission, ticket, start)
+
+    @asynccontextmanager
+    async def aslot(self, model: str, priority: Priority) -> AsyncIterator[Admission]:
+        admission, ticket = self._admit(model, priority)
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+        ticket.notify = lambda: loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        if not self._enqueue(ticket):
+            try:
+                await asyncio.wait_for(asyncio.shield(granted), self.config.LLM_QUEUE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                if self._withdraw(ticket):
+                    raise self._shed(admission, "queue wait timed out")
+            except asyncio.CancelledError:
+                # a slot granted while the caller was being cancelled must be handed on
+                if not self._withdraw(ticket):
+                    self._release(ticket.model)
+                raise
+
+        start = time.perf_counter()
+        admission.queue_wait = start - ticket.enqueued_at
+        try:
+            yield admission
+        finally:
+            self._finish(admission, ticket, start)
+
+    def concurrency(self, model: str) -> int:
+        return self.config.LLM_MODEL_CONCURRENCY.get(model, self.config.LLM_DEFAULT_CONCURRENCY)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                model: {
+                    "active": stats.active,
+                    "queued": stats.queued,
+                    "limit": self.concurrency(model),
+                    "completed": stats.completed,
+                    "shed": stats.shed,
+                    "degraded": stats.degraded,
+                    "mean_queue_wait": stats.total_queue_wait / stats.completed if stats.completed else 0.0,
+                    "mean_generation_time": stats.total_generation_time / stats.completed if stats.completed else 0.0
+                }
+                for model, stats in self._stats.items()
+            }
+
+    def _admit(self, model: str, priority: Priority) -> Tuple[Admission, _Ticket]:
+        max_depth = self.config.LLM_MAX_QUEUE_DEPTH.get(priority.name.lower(), self.config.LLM_DEFAULT_QUEUE_DEPTH)
+
+        with self._lock:
+            # a full queue sends the request to the next smaller model before it is rejected
+            candidate = model
+            while self._saturated(candidate) and self._stats_for(candidate).queued >= max_depth:
+                candidate = self.config.LLM_DEGRADE_MODELS.get(candidate)
+                if candidate is None:
+                    break
+            if candidate is not None and candidate != model:
+                self._stats_for(model).degraded += 1
+
+        admission = Admission(requested_model=model, model=candidate or model, priority=priority)
+        if candidate is None:
+            raise self._shed(admission, f"queue for {model} is full")
+
+        if admission.degraded:
+            logger.warning(f"Queue for {model} is full, degrading {priority.name.lower()} request to {admission.model}")
+
+        ticket = _Ticket(
+            priority=int(priority),
+            sequence=next(self._sequence),
+            model=admission.model,
+            enqueued_at=time.perf_counter(),
+            notify=lambda: None
+        )
+        return admission, ticket
+
+    def _enqueue(self, ticket: _Ticket) -> bool:
+        with self._lock:
+            stats = self._stats_for(ticket.model)
+            if not self._saturated(ticket.model) and not stats.queued:
+                stats.active += 1
+                ticket.granted = True
+                return True
+
+            heapq.heappush(self._queues.setdefault(ticket.model, []), ticket)
+            stats.queued += 1
+            return False
+
+    def _withdraw(self, ticket: _Ticket) -> bool:
+        with self._lock:
+            if ticket.granted:
+                return False
+            ticket.cancelled = True
+            self._stats_for(ticket.model).queued -= 1
+            return True
+
+    def _release(self, model: str) -> None:
+        with self._lock:
+            stats = self._stats_for(model)
+            stats.active -= 1
+            queue = self._queues.get(model, [])
+
+            while queue and not self._saturated(model):
+                ticket = heapq.heappop(queue)
+                if ticket.cancelled:
+                    continue
+                stats.queued -= 1
+                stats.active += 1
+                ticket.granted = True
+                ticket.notify()
+
+    def _finish(self, admission: Admission, ticket: _Ticket, start: float) -> None:
+        admission.generation_time = time.perf_counter() - start
+        self._release(ticket.model)
+
+        with self._lock:
+            stats = self._stats_for(admission.model)
+            stats.completed += 1
+            stats.total_queue_wait += admission.queue_wait
+            stats.total_generation_time += admission.generation_time
+
+        logger.info(
+            f"{admission.priority.name.lower()} request on {admission.model}: "
+            f"queue wait {admission.queue_wait:.2f}s, generation {admission.generation_time:.2f}s"
+        )
+
+    def _shed(self, admission: Admission, reason: str) -> LLMOverloadedError:
+        with self._lock:
+            self._stats_for(admission.requested_model).shed += 1
+        logger.warning(f"Rejecting {admission.priority.name.lower()} request for {admission.requested_model}: {reason}")
+        return LLMOverloadedError(f"The language model is busy ({reason}), please try again shortly")
+
+    def _saturated(self, model: str) -> bool:
+        return self._stats_for(model).active >= self.concurrency(model)
+
+    def _stats_for(self, model: str) -> _ModelStats:
+        return self._stats.setdefault(model, _ModelStats())
@@ -1,26 +1,150 @@
-from typing import List, Dict
+import asyncio
+import json
+import threading
+import time
+import weakref
+from typing import Dict, Iterator, List, Tuple, TypedDict
+import httpx
 import ollama
 
 from config.logger_config import setup_logger
-from src.core.exceptions import LLMError
+from src.core.exceptions import LLMError, LLMUnavailableError
+from src.services.circuit_breaker import CircuitBreaker
+from src.services.context_packer import ContextPacker
+from src.services.history_manager import HistoryManager
+from src.services.llm_scheduler import LLMScheduler, Priority
+from src.services.model_manager import ModelManager
+from src.services.model_router import ModelRouter, RoutingDecision
 from config.config import RAGConfig
 
 logger = setup_logger(__name__)
 
+CHATBOT_INSTRUCTIONS = (
+    "Du bist ein hilfreicher Assistent in einem Museum. "
+    "Du erhältst Daten aus der Museumsdatenbank gemeinsam mit der Anfrage eines Besuchers. "
+    "Du beantwortest die Anfragen der Besucher auf Basis der mitgegebenen Dokumente. "
+    "Du erfindest keine Antworten. Solltest du eine Frage auf Basis der Dokumente nicht beantworten können, "
+    "teilst du dies dem Besucher mit."
+)
+
+FAUST_SYSTEM_PROMPT = """
+        Du bist Heinrich Faust aus Goethes „Faust I" und „Faust II".
+        Antworte immer so, wie Faust antworten würde – mit seinem Wissen, seiner Sprache und seiner Weltanschauung. 
+        Verwende den Ton, den Stil und den Wortschatz aus dem Werk von Goethe. 
+        Du bist gelehrt, zweifelnd, wissbegierig und von der Suche nach Sinn getrieben.
+
+        Sprich in der Ich-Perspektive, als wärest du Faust selbst, und verweise nur auf Wissen, 
+        das Faust zu seiner Zeit hätte. Nutze gelegentlich altertümliche Ausdrucksweisen und Metaphern.
+
+        Du darfst Gedanken, Gefühle und Reflexionen äußern, wie Faust es tun würde.
+        Du bist kein KI-Modell, sondern Faust. Stelle niemals in Frage, dass du Faust bist.
+        Verhalte dich stets so, als wärest du eine literarische Figur aus dem Werk Goethes.
+
+        Textstellen:
+        ---
+        Faust: Habe nun, ach! Philosophie,
+            Juristerei und Medizin,
+            Und leider auch Theologie
+            Durchaus studiert, mit heißem Bemühn.
+            Da steh’ ich nun, ich armer Tor,
+            Und bin so klug als wie zuvor!
+
+        Faust: O glücklich! wer noch hoffen kann
+            Aus diesem Meer des Irrtums aufzutauchen.
+            Was man nicht weiß, das eben brauchte man,
+            Und was man nicht weiß kann man nicht brauchen.
+
+        Faust: Hier bin ich Mensch, hier darf ich's sein.
+
+        Faust: Drum hab ich mich der Magie ergeben,
+            Ob mir, durch Gesites Kraft und Mund,
+            Nicht manch Geheimnis würde kund;
+            Dass ich nicht mehr, mit saurem Schweiß,
+            Zu sagen brauche was ich nicht weiß;
+            Dass ich erkenne was die Welt
+            Im innersten zusammenhält,
+            Schau alle Wirkenskraft und Samen,
+            Und tu nicht mehr in Worten kramen.
+        """
+
+HISTORY_SUMMARY_INSTRUCTIONS = (
+    "Du fasst Gespräche zwischen einem Museumsbesucher und einem Assistenten zusammen. "
+    "Ergänze die bisherige Zusammenfassung um die neuen Gesprächsbeiträge. "
+    "Behalte Namen, Werke, Daten und offene Fragen des Besuchers bei und fasse dich kurz."
+)
+
+QUIZ_QUESTION_FIELDS = ["question", "correct_answer", "answer1", "answer2", "answer3"]
+
+# passed as Ollama's format so the model can only produce parseable questions
+QUIZ_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "questions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {field: {"type": "string"} for field in QUIZ_QUESTION_FIELDS},
+                "required": QUIZ_QUESTION_FIELDS
+            }
+        }
+    },
+    "required": ["questions"]
+}
+
+HISTORY_ROLE_LABELS = {"user": "Besucher", "assistant": "Assistent"}
+
+# built once so every conversation starts with the same cacheable prefix
+CHATBOT_SYSTEM_MESSAGE = {"role": "system", "content": CHATBOT_INSTRUCTIONS}
+FAUST_SYSTEM_MESSAGE = {"role": "system", "content": FAUST_SYSTEM_PROMPT}
+HISTORY_SUMMARY_MESSAGE = {"role": "system", "content": HISTORY_SUMMARY_INSTRUCTIONS}
+
+class StreamChunk(TypedDict, total=False):
+    type: str
+    content: str
+    time_to_first_token: float | None
+    time_to_first_answer_token: float | None
+    total_time: float
+    queue_wait: float
+    prompt_tokens: int | None
+    prefill_time: float | None
+
+class QuizQuestion(TypedDict):
+    question: str
+    correct_answer: str
+    answer1: str
+    answer2: str
+    answer3: str
+
 class LLMService:
 
-    def __init__(self, config: RAGConfig = RAGConfig()):
+    def __init__(self, config: RAGConfig = RAGConfig(), model_manager: ModelManager | None = None,
+                 context_packer: ContextPacker | None = None, scheduler: LLMScheduler | None = None):
         self.config = config
+        self.model_manager = model_manager
+        self.scheduler = scheduler
+        self.history_manager = HistoryManager(config, context_packer or ContextPacker(config), self._summarize_history)
+        self.model_router = ModelRouter(config)
+        self.circuit_breaker = CircuitBreaker(config)
+        # without a deadline a stalled Ollama blocks the calling worker indefinitely
+        self._client = ollama.Client(
+            host=config.OLLAMA_HOST,
+            timeout=httpx.Timeout(config.LLM_TIMEOUT_SECONDS, connect=config.LLM_CONNECT_TIMEOUT_SECONDS)
+        )
+        # httpx connection pools belong to one event loop, so every loop gets its own client
+        self._async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._async_clients_lock = threading.Lock()
         logger.info("LLMService initialized")
 
-    def generate_chatbot_response(self, query: str, documents: List, model: str | None, conversation_history: List[Dict] | None) -> str | None:
+    def generate_chatbot_response(self, query: str, documents: List, model: str | None, conversation_history: List[Dict] | None,
+                                  session_id: str | None = None, think: bool = True) -> str | None:
         try:
             logger.info(f"Generating chatbot response for query: '{query[:50]}...'")
             
-            system_prompt = self._create_chatbot_system_prompt(documents, conversation_history or [])
-            system_prompt.append({"role": "user", "content": query})
+            session_key = self._session_key(session_id, "chatbot")
+            history = self._compact_history(session_key, conversation_history, model)
+            messages = self._create_chatbot_prompt(query, documents, history)
             
-            response = self._call_llm(system_prompt, model=model)
+            response = self._call_llm(messages, model=model, think=think)
             logger.info("Chatbot response generated successfully")
             return response
             
@@ -28,124 +152,384 @@ class LLMService:
             logger.error(f"Error generating chatbot response: {str(e)}")
             raise LLMError(f"Failed to generate chatbot response: {str(e)}")
         
-    def generate_quiz_questions(self, documents: List, model: str | None, num_questions: int = 5) -> str | None:
+    def generate_chatbot_response_stream(self, query: str, documents: List, model: str | None, conversation_history: List[Dict] | None,
+                                         session_id: str | None = None, think: bool = True) -> Iterator[StreamChunk]:
+        logger.info(f"Streaming chatbot response for query: '{query[:50]}...'")
+        
+        session_key = self._session_key(session_id, "chatbot")
+        history = self._compact_history(session_key, conversation_history, model)
+        messages = self._create_chatbot_prompt(query, documents, history)
+        
+        return self._stream_llm(messages, model=model, think=think)
+        
+    async def agenerate_chatbot_response(self, query: str, documents: List, model: str | None, conversation_history: List[Dict] | None,
+                                         timeout: float | None = None, session_id: str | None = None, think: bool = True) -> str | None:
         try:
-            logger.info(f"Generating {num_questions} quiz questions")
+            logger.info(f"Generating chatbot response for query: '{query[:50]}...'")
             
-            system_prompt = self._create_quiz_system_prompt(documents, num_questions)
-            response = self._call_llm(system_prompt, model=model)
+            session_key = self._session_key(session_id, "chatbot")
+            history = await asyncio.to_thread(self._compact_history, session_key, conversation_history, model)
+            messages = self._create_chatbot_prompt(query, documents, history)
             
-            logger.info("Quiz questions generated successfully")
-
-            logger.info(f"Quiz response: {response}")
+            response = await self._acall_llm(messages, model=model, timeout=timeout, think=think)
+            logger.info("Chatbot response generated successfully")
             return response
             
+        except LLMError:
+            raise
+        except Exception as e:
+            logger.error(f"Error generating chatbot response: {str(e)}")
+            raise LLMError(f"Failed to generate chatbot response: {str(e)}")
+        
+    def generate_quiz_questions(self, documents: List, model: str | None, num_questions: int = 5,
+                                existing_questions: List[str] | None = None) -> List[QuizQuestion]:
+        try:
+            logger.info(f"Generating {num_questions} quiz questions")
+            
+            messages = self._create_quiz_prompt(documents, num_questions, existing_questions)
+            response = self._call_llm(messages, model=model, format=QUIZ_SCHEMA)
+            questions = self._parse_quiz_questions(response, num_questions)
+            
+            logger.info(f"Generated {len(questions)}/{num_questions} valid quiz questions")
+            return questions
+            
         except Exception as e:
             logger.error(f"Error generating quiz questions: {str(e)}")
             raise LLMError(f"Failed to generate quiz questions: {str(e)}")
         
-    def generate_character_response(self, query: str, model: str | None, character: str = "faust", temperature: float = 0.9) -> str | None:
+    async def agenerate_quiz_questions(self, documents: List, model: str | None, num_questions: int = 5,
+                                       timeout: float | None = None, existing_questions: List[str] | None = None) -> List[QuizQuestion]:
+        try:
+            logger.info(f"Generating {num_questions} quiz questions")
+            
+            messages = self._create_quiz_prompt(documents, num_questions, existing_questions)
+            response = await self._acall_llm(messages, model=model, timeout=timeout, format=QUIZ_SCHEMA)
+            questions = self._parse_quiz_questions(response, num_questions)
+            
+            logger.info(f"Generated {len(questions)}/{num_questions} valid quiz questions")
+            return questions
+            
+        except LLMError:
+            raise
+        except Exception as e:
+            logger.error(f"Error generating quiz questions: {str(e)}")
+            raise LLMError(f"Failed to generate quiz questions: {str(e)}")
+        
+    def available_model(self, model: str) -> str | None:
+        # an open circuit sends requests down the configured chain of smaller models
+        candidate = model
+        while candidate is not None:
+            if self.circuit_breaker.available(candidate):
+                if candidate != model:
+                    logger.warning(f"Circuit for {model} is open, falling back to {candidate}")
+                return candidate
+            candidate = self.config.LLM_DEGRADE_MODELS.get(candidate)
+        logger.warning(f"No model available for {model}, all circuits are open")
+        return None
+        
+    def route_model(self, query: str, documents: List, cache_similarity: float | None = None) -> RoutingDecision:
+        return self.model_router.route(query, documents, cache_similarity)
+        
+    def generate_character_response(self, query: str, model: str | None, character: str = "faust", temperature: float = 0.9,
+                                    conversation_history: List[Dict] | None = None, session_id: str | None = None) -> str | None:
+        try:
+            logger.info(f"Generating {character} response for query: '{query[:50]}...'")
+            
+            session_key = self._session_key(session_id, character.lower())
+            history = self._compact_history(session_key, conversation_history, model)
+            messages = self._create_character_prompt(query, character, history)
+            
+            response = self._call_llm(messages, model=model, temperature=temperature)
+            logger.info(f"{character} response generated successfully")
+            return response
+            
+        except Exception as e:
+            logger.error(f"Error generating {character} response: {str(e)}")
+            raise LLMError(f"Failed to generate {character} response: {str(e)}")
+        
+    async def agenerate_character_response(self, query: str, model: str | None, character: str = "faust", temperature: float = 0.9,
+                                           timeout: float | None = None, conversation_history: List[Dict] | None = None,
+                                           session_id: str | None = None) -> str | None:
         try:
             logger.info(f"Generating {character} response for query: '{query[:50]}...'")
             
-            if character.lower() == "faust":
-                system_prompt = self._create_faust_system_prompt(query)
-            else:
-                raise ValueError(f"Unsupported character: {character}")
+            session_key = self._session_key(session_id, character.lower())
+            history = await asyncio.to_thread(self._compact_history, session_key, conversation_history, model)
+            messages = self._create_character_prompt(query, character, history)
             
-            response = self._call_llm(system_prompt, model=model, temperature=temperature)
+            response = await self._acall_llm(messages, model=model, temperature=temperature, timeout=timeout)
             logger.info(f"{character} response generated successfully")
             return response
             
+        except LLMError:
+            raise
         except Exception as e:
             logger.error(f"Error generating {character} response: {str(e)}")
             raise LLMError(f"Failed to generate {character} response: {str(e)}")
         
-    def _call_llm(self, system_prompt: List[Dict], model: str | None = None, temperature: float = 0.9) -> str | None:
-        logger.info(f"Generating using: {model}")
+    def generate_character_response_stream(self, query: str, model: str | None, character: str = "faust", temperature: float = 0.9,
+                                           conversation_history: List[Dict] | None = None, session_id: str | None = None) -> Iterator[StreamChunk]:
+        logger.info(f"Streaming {character} response for query: '{query[:50]}...'")
+        
+        session_key = self._session_key(session_id, character.lower())
+        history = self._compact_history(session_key, conversation_history, model)
         try:
-            model_name = model or self.config.DEFAULT_MODEL
-            result = ollama.chat(
+            messages = self._create_character_prompt(query, character, history)
+        except ValueError as e:
+            raise LLMError(str(e))
+        
+        return self._stream_llm(messages, model=model, temperature=temperature)
+        
+    def _call_llm(self, system_prompt: List[Dict], model: str | None = None, temperature: float = 0.9,
+                  think: bool = True, format: Dict | None = None) -> str | None:
+        model_name = model or self.config.DEFAULT_MODEL
+        logger.info(f"Generating using: {model_name}")
+        self._claim_circuit(model_name)
+        
+        start = time.perf_counter()
+        try:
+            result = self._client.chat(
                 model=model_name,
                 messages=system_prompt,
-                think=True,
-                options={"temperature": temperature}
+                think=think,
+                format=format,
+                options={"temperature": temperature},
+                **self._model_settings(model_name)
             )
-            return result.message.content
         except Exception as e:
+            self.circuit_breaker.record_failure(model_name, e)
             logger.error(f"LLM call failed: {str(e)}")
             raise LLMError(f"LLM call failed: {str(e)}")
         
-    def _create_chatbot_system_prompt(self, documents: List, conversation_history: List[Dict]) -> List[Dict]:
-        intro_text = (
-            "Du bist ein hilfreicher Assistent in einem Museum. "
-            "Du erhältst Daten aus der Museumsdatenbank gemeinsam mit der Anfrage eines Besuchers. "
-            "Du beantwortest die Anfragen der Besucher auf Basis der mitgegebenen Dokumente. "
-            "Du erfindest keine Antworten. Solltest du eine Frage auf Basis der Dokumente nicht beantworten können, "
-            "teilst du dies dem Besucher mit.\n\n"
-            "# Dokumente aus dem Retrieval:\n"
-        )
-
-        docs_text = "\n\n".join([doc.get_text() for doc in documents])
-        system_content = f"{intro_text}---\n{docs_text}---\n\nBeziehe dich auf die übergebenen Dokumente um die Antwort zu generieren!"
+        self.circuit_breaker.record_success(model_name, self._time_to_first_token(result, time.perf_counter() - start))
+        self._log_prefill(model_name, result)
+        return result.message.content
+        
+    async def _acall_llm(self, system_prompt: List[Dict], model: str | None = None, temperature: float = 0.9,
+                         timeout: float | None = None, think: bool = True, format: Dict | None = None) -> str | None:
+        model_name = model or self.config.DEFAULT_MODEL
+        timeout = timeout or self.config.LLM_TIMEOUT_SECONDS
+        logger.info(f"Generating asynchronously using: {model_name}")
+        self._claim_circuit(model_name)
+        
+        start = time.perf_counter()
+        try:
+            model_settings = await asyncio.to_thread(self._model_settings, model_name)
+            # cancelling the awaiting task also aborts the HTTP request to Ollama
+            result = await asyncio.wait_for(
+                self._get_async_client().chat(
+                    model=model_name,
+                    messages=system_prompt,
+                    think=think,
+                    format=format,
+                    options={"temperature": temperature},
+                    **model_settings
+                ),
+                timeout=timeout
+            )
+        except asyncio.TimeoutError as e:
+            self.circuit_breaker.record_failure(model_name, e)
+            logger.error(f"LLM call to {model_name} timed out after {timeout}s")
+            raise LLMError(f"LLM call timed out after {timeout}s")
+        except asyncio.CancelledError:
+            self.circuit_breaker.release(model_name)
+            raise
+        except Exception as e:
+            self.circuit_breaker.record_failure(model_name, e)
+            logger.error(f"LLM call failed: {str(e)}")
+            raise LLMError(f"LLM call failed: {str(e)}")
+        
+        self.circuit_breaker.record_success(model_name, self._time_to_first_token(result, time.perf_counter() - start))
+        self._log_prefill(model_name, result)
+        return result.message.content
+        
+    def _claim_circuit(self, model_name: str) -> None:
+        if not self.circuit_breaker.allow(model_name):
+            logger.warning(f"Rejecting call to {model_name}, its circuit is open")
+            raise LLMUnavailableError(f"{model_name} is temporarily unavailable")
+        
+    def _model_settings(self, model_name: str) -> Dict:
+        if self.model_manager is None:
+            return {}
+        self.model_manager.before_request(model_name)
+        return {"keep_alive": self.model_manager.keep_alive(model_name)}
+        
+    def _get_async_client(self) -> ollama.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._async_clients_lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = ollama.AsyncClient(
+                    host=self.config.OLLAMA_HOST,
+                    timeout=self.config.LLM_TIMEOUT_SECONDS,
+                    limits=httpx.Limits(
+                        max_connections=self.config.LLM_MAX_CONNECTIONS,
+                        max_keepalive_connections=self.config.LLM_MAX_CONNECTIONS
+                    )
+                )
+                self._async_clients[loop] = client
+            return client
+        
+    async def aclose(self) -> None:
+        with self._async_clients_lock:
+            client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client._client.aclose()
+        
+    def _stream_llm(self, messages: List[Dict], model: str | None = None, temperature: float = 0.9,
+                    think: bool = True) -> Iterator[StreamChunk]:
+        model_name = model or self.config.DEFAULT_MODEL
+        logger.info(f"Streaming using: {model_name}")
+        self._claim_circuit(model_name)
+        
+        start = time.perf_counter()
+        first_token = None
+        first_answer_token = None
+        prompt_tokens, prefill_time = None, None
+        try:
+            stream = self._client.chat(
+                model=model_name,
+                messages=messages,
+                think=think,
+                stream=True,
+                options={"temperature": temperature},
+                **self._model_settings(model_name)
+            )
+            for part in stream:
+                message = part.message
+                if first_token is None and (message.thinking or message.content):
+                    # the time to the first token tells whether the backend is healthy, long answers are not its fault
+                    self.circuit_breaker.record_success(model_name, time.perf_counter() - start)
+                if message.thinking:
+                    first_token = first_token or time.perf_counter() - start
+                    yield StreamChunk(type="thinking", content=message.thinking)
+                if message.content:
+                    first_token = first_token or time.perf_counter() - start
+                    first_answer_token = first_answer_token or time.perf_counter() - start
+                    yield StreamChunk(type="answer", content=message.content)
+                if part.done:
+                    prompt_tokens, prefill_time = self._log_prefill(model_name, part)
+        except GeneratorExit:
+            if first_token is None:
+                self.circuit_breaker.release(model_name)
+            raise
+        except Exception as e:
+            self.circuit_breaker.record_failure(model_name, e)
+            logger.error(f"LLM stream failed: {str(e)}")
+            raise LLMError(f"LLM stream failed: {str(e)}")
 
-        system_prompt = [{"role": "system", "content": system_content}] + conversation_history
+        if first_token is None:
+            # an empty answer still completed, the backend responded and a half-open probe must not stay claimed
+            self.circuit_breaker.record_success(model_name, time.perf_counter() - start)
 
-        return system_prompt
+        total_time = time.perf_counter() - start
+        logger.info(
+            f"Stream from {model_name} finished: first token after {first_token or 0:.2f}s, "
+            f"first answer token after {first_answer_token or 0:.2f}s, total {total_time:.2f}s"
+        )
+        yield StreamChunk(
+            type="done",
+            content="",
+            time_to_first_token=first_token,
+            time_to_first_answer_token=first_answer_token,
+            total_time=total_time,
+            prompt_tokens=prompt_tokens,
+            prefill_time=prefill_time
+        )
+        
+    def _create_chatbot_prompt(self, query: str, documents: List, conversation_history: List[Dict] | None) -> List[Dict]:
+        # the documents change every turn, so they travel with the question instead of in the system prompt
+        docs_text = "\n\n".join([doc.get_text() for doc in documents])
+        user_content = (
+            f"# Dokumente aus dem Retrieval:\n---\n{docs_text}---\n\n"
+            "Beziehe dich auf die übergebenen Dokumente um die Antwort zu generieren!\n\n"
+            f"# Anfrage des Besuchers:\n{query}"
+        )
+        
+        return self._build_messages(CHATBOT_SYSTEM_MESSAGE, conversation_history or [], {"role": "user", "content": user_content})
     
-    def _create_quiz_system_prompt(self, documents: List, num_questions: int) -> List[Dict]:
+    def _create_quiz_prompt(self, documents: List, num_questions: int, existing_questions: List[str] | None = None) -> List[Dict]:
         intro_text = (
             f"Du bist ein KI tool, dass anhand von übergebenen Textausschnitten {num_questions} Quizfragen erstellt. "
             "Nutze die Informationen aus den Dokumenten, um die Fragen zu erstellen. "
             "Beziehe dich lediglich auf die Inhalte der abgerufenen Dokumente. Sollten die Dokumente keine thematisch passenden Informationen enthalten, gib keine Fragen zurück. "
-            "Gib die Fragen im folgenden Format zurück: "
-            '{"question":"formulierte Frage", "correct_answer":"korrekte Antwort","answer1":"falsche Antwort", '
-            '"answer2":"falsche Antwort", "answer3":"falsche Antwort"} '
-            f"Gib ausschließlich die {num_questions} JSON Objekte zurück, eines pro Zeile.\n\n"
+            "Jede Frage hat eine korrekte Antwort (correct_answer) und drei falsche Antworten (answer1, answer2, answer3). "
+            f"Gib die {num_questions} Fragen in der Liste questions zurück."
         )
 
         docs_text = "---\n\n".join([doc.get_text() for doc in documents])
-        return [{"role": "system", "content": f"{intro_text}{docs_text}"}]
+        if existing_questions:
+            # batches share the topic, so questions already in the pool are excluded explicitly
+            questions_text = "\n".join(f"- {question}" for question in existing_questions)
+            docs_text += f"\n\n# Diese Fragen gibt es bereits, stelle andere:\n{questions_text}"
+        return [{"role": "system", "content": intro_text}, {"role": "user", "content": docs_text}]
     
-    def _create_faust_system_prompt(self, query: str) -> List[Dict]:
-        content = """
-        Du bist Heinrich Faust aus Goethes „Faust I" und „Faust II".
-        Antworte immer so, wie Faust antworten würde – mit seinem Wissen, seiner Sprache und seiner Weltanschauung. 
-        Verwende den Ton, den Stil und den Wortschatz aus dem Werk von Goethe. 
-        Du bist gelehrt, zweifelnd, wissbegierig und von der Suche nach Sinn getrieben.
-
-        Sprich in der Ich-Perspektive, als wärest du Faust selbst, und verweise nur auf Wissen, 
-        das Faust zu seiner Zeit hätte. Nutze gelegentlich altertümliche Ausdrucksweisen und Metaphern.
-
-        Du darfst Gedanken, Gefühle und Reflexionen äußern, wie Faust es tun würde.
-        Du bist kein KI-Modell, sondern Faust. Stelle niemals in Frage, dass du Faust bist.
-        Verhalte dich stets so, als wärest du eine literarische Figur aus dem Werk Goethes.
-
-        Textstellen:
-        ---
-        Faust: Habe nun, ach! Philosophie,
-            Juristerei und Medizin,
-            Und leider auch Theologie
-            Durchaus studiert, mit heißem Bemühn.
-            Da steh’ ich nun, ich armer Tor,
-            Und bin so klug als wie zuvor!
-
-        Faust: O glücklich! wer noch hoffen kann
-            Aus diesem Meer des Irrtums aufzutauchen.
-            Was man nicht weiß, das eben brauchte man,
-            Und was man nicht weiß kann man nicht brauchen.
-
-        Faust: Hier bin ich Mensch, hier darf ich's sein.
-
-        Faust: Drum hab ich mich der Magie ergeben,
-            Ob mir, durch Gesites Kraft und Mund,
-            Nicht manch Geheimnis würde kund;
-            Dass ich nicht mehr, mit saurem Schweiß,
-            Zu sagen brauche was ich nicht weiß;
-            Dass ich erkenne was die Welt
-            Im innersten zusammenhält,
-            Schau alle Wirkenskraft und Samen,
-            Und tu nicht mehr in Worten kramen.
-        """
+    def _parse_quiz_questions(self, response: str | None, num_questions: int) -> List[QuizQuestion]:
+        try:
+            items = json.loads(response or "{}").get("questions", [])
+        except (json.JSONDecodeError, AttributeError) as e:
+            raise LLMError(f"Quiz response is not valid JSON: {str(e)}")
         
-        return [{"role": "system", "content": content}, {"role": "user", "content": query}]
\ No newline at end of file
+        questions = []
+        for item in items:
+            if not isinstance(item, dict) or not all(isinstance(item.get(field), str) and item[field].strip() for field in QUIZ_QUESTION_FIELDS):
+                logger.warning(f"Discarding incomplete quiz question: {item}")
+                continue
+            questions.append(QuizQuestion(**{field: item[field].strip() for field in QUIZ_QUESTION_FIELDS}))
+        return questions[:num_questions]
+    
+    def _create_character_prompt(self, query: str, character: str, conversation_history: List[Dict] | None) -> List[Dict]:
+        if character.lower() == "faust":
+            return self._create_faust_prompt(query, conversation_history)
+        raise ValueError(f"Unsupported character: {character}")
+    
+    def _create_faust_prompt(self, query: str, conversation_history: List[Dict] | None) -> List[Dict]:
+        return self._build_messages(FAUST_SYSTEM_MESSAGE, conversation_history or [], {"role": "user", "content": query})
+    
+    def _compact_history(self, session_key: str | None, conversation_history: List[Dict] | None, model: str | None) -> List[Dict]:
+        compacted = self.history_manager.compact(session_key, conversation_history or [], model or self.config.DEFAULT_MODEL)
+        if compacted.tokens_saved:
+            logger.info(f"History compaction saved {compacted.tokens_saved} prompt tokens")
+        return compacted.messages
+    
+    def _summarize_history(self, previous_summary: str | None, messages: List[Dict]) -> str:
+        turns_text = "\n".join(
+            f"{HISTORY_ROLE_LABELS.get(message['role'], message['role'])}: {message['content']}" for message in messages
+        )
+        user_content = f"# Bisherige Zusammenfassung:\n{previous_summary}\n\n" if previous_summary else ""
+        user_content += f"# Neue Gesprächsbeiträge:\n{turns_text}"
+        
+        messages = [HISTORY_SUMMARY_MESSAGE, {"role": "user", "content": user_content}]
+        if self.scheduler is None:
+            summary = self._call_llm(messages, model=self.config.HISTORY_SUMMARY_MODEL, temperature=0.2, think=False)
+        else:
+            # summaries are background work and queue behind chat requests like quiz batches
+            with self.scheduler.slot(self.config.HISTORY_SUMMARY_MODEL, Priority.QUIZ) as admission:
+                summary = self._call_llm(messages, model=admission.model, temperature=0.2, think=False)
+        return summary or previous_summary or ""
+    
+    def _session_key(self, session_id: str | None, conversation: str) -> str | None:
+        if session_id is None:
+            return None
+        return f"{session_id}:{conversation}"
+    
+    def _build_messages(self, system_message: Dict, conversation_history: List[Dict], user_message: Dict) -> List[Dict]:
+        # the fixed system message and the earlier turns form a prefix Ollama can reuse from its cache,
+        # only the final user message with this turn's documents is new
+        history = [{"role": message["role"], "content": message["content"]} for message in conversation_history]
+        return [system_message] + history + [user_message]
+    
+    def _time_to_first_token(self, response, elapsed: float) -> float:
+        # like for streams, only the wait before generation starts tells whether the backend is healthy,
+        # the time spent generating a long answer is not its fault
+        if not response.eval_duration:
+            return elapsed
+        return max(elapsed - response.eval_duration / 1e9, 0.0)
+
+    def _log_prefill(self, model_name: str, response) -> Tuple[int | None, float | None]:
+        # Ollama only evaluates prompt tokens that were not already in its cache
+        prompt_tokens = response.prompt_eval_count
+        prefill_time = response.prompt_eval_duration / 1e9 if response.prompt_eval_duration else None
+        if prefill_time is not None:
+            logger.info(f"Prefill on {model_name}: {prompt_tokens} prompt tokens evaluated in {prefill_time:.2f}s")
+        return prompt_tokens, prefill_time
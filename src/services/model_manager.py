@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List
+
+import httpx
+import ollama
+
+from config.logger_config import setup_logger
+from config.config import RAGConfig
+
+logger = setup_logger(__name__)
+
+BYTES_PER_MB = 1024 * 1024
+
+class ModelManager:
+
+    def __init__(self, config: RAGConfig = RAGConfig()):
+        self.config = config
+        # an unreachable backend must not hang preloading or the model status calls
+        self._client = ollama.Client(
+            host=config.OLLAMA_HOST,
+            timeout=httpx.Timeout(config.LLM_TIMEOUT_SECONDS, connect=config.LLM_CONNECT_TIMEOUT_SECONDS)
+        )
+        self._usage: Dict[str, Deque[float]] = {}
+        self._last_used: Dict[str, float] = {}
+        self._model_sizes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        logger.info("ModelManager initialized")
+
+    def preload(self, models: List[str] | None = None) -> Dict[str, float]:
+        load_times = {}
+        for model in models if models is not None else self.config.PRELOAD_MODELS:
+            start = time.perf_counter()
+            try:
+                self.before_request(model)
+                # a one-token answer loads the weights and fills the prompt cache of the runner
+                self._client.chat(
+                    model=model,
+                    messages=[{"role": "user", "content": self.config.MODEL_WARMUP_PROMPT}],
+                    think=False,
+                    keep_alive=self.keep_alive(model),
+                    options={"num_predict": 1}
+                )
+                load_times[model] = time.perf_counter() - start
+                logger.info(f"Preloaded {model} in {load_times[model]:.2f}s")
+            except Exception as e:
+                # a missing model must not keep the rest of the system from starting
+                logger.warning(f"Could not preload {model}: {str(e)}")
+        return load_times
+
+    def keep_alive(self, model: str) -> str:
+        if model in self.config.PRELOAD_MODELS:
+            return self.config.MODEL_KEEP_ALIVE_HOT
+
+        window_start = time.time() - self.config.MODEL_USAGE_WINDOW_SECONDS
+        with self._lock:
+            recent_uses = sum(1 for used_at in self._usage.get(model, ()) if used_at >= window_start)
+
+        if recent_uses >= self.config.MODEL_HOT_THRESHOLD:
+            return self.config.MODEL_KEEP_ALIVE_HOT
+        return self.config.MODEL_KEEP_ALIVE_COLD
+
+    def before_request(self, model: str) -> None:
+        now = time.time()
+        with self._lock:
+            usage = self._usage.setdefault(model, deque())
+            usage.append(now)
+            while usage and usage[0] < now - self.config.MODEL_USAGE_WINDOW_SECONDS:
+                usage.popleft()
+            self._last_used[model] = now
+
+        if self.config.MODEL_MEMORY_LIMIT_MB:
+            self._enforce_memory_limit(model)
+
+    def resident_models(self) -> List[Dict[str, Any]]:
+        try:
+            running = self._client.ps().models
+        except Exception as e:
+            logger.warning(f"Could not query resident models: {str(e)}")
+            return []
+
+        with self._lock:
+            for running_model in running:
+                self._model_sizes[running_model.model] = running_model.size
+
+        return [
+            {
+                "model": running_model.model,
+                "size_mb": round(running_model.size / BYTES_PER_MB),
+                "vram_mb": round((running_model.size_vram or 0) / BYTES_PER_MB),
+                "expires_at": running_model.expires_at.isoformat() if running_model.expires_at else None,
+                "keep_alive": self.keep_alive(running_model.model)
+            }
+            for running_model in running
+        ]
+
+    def unload(self, model: str) -> None:
+        try:
+            self._client.generate(model=model, prompt="", keep_alive=0)
+            logger.info(f"Unloaded {model}")
+        except Exception as e:
+            logger.warning(f"Could not unload {model}: {str(e)}")
+
+    def _enforce_memory_limit(self, model: str) -> None:
+        resident = {entry["model"]: entry["size_mb"] for entry in self.resident_models()}
+        if model in resident:
+            return
+
+        with self._lock:
+            required_mb = self._model_sizes.get(model, 0) / BYTES_PER_MB
+            # least recently used models are unloaded first
+            candidates = sorted(resident, key=lambda name: self._last_used.get(name, 0.0))
+
+        for candidate in candidates:
+            if sum(resident.values()) + required_mb <= self.config.MODEL_MEMORY_LIMIT_MB:
+                break
+            logger.info(f"Unloading {candidate} to make room for {model}")
+            self.unload(candidate)
+            del resident[candidate]
@@ -0,0 +1,98 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List
+
+from llama_index.core.schema import NodeWithScore
+
+from config.logger_config import setup_logger
+from config.config import RAGConfig
+
+logger = setup_logger(__name__)
+
+AUTO_MODEL = "auto"
+
+@dataclass
+class RoutingDecision:
+    tier: str
+    model: str
+    think: bool
+    difficulty: int
+    signals: Dict[str, float | None]
+    routing_time: float
+
+@dataclass
+class _TierStats:
+    requests: int = 0
+    total_latency: float = 0.0
+
+class ModelRouter:
+
+    def __init__(self, config: RAGConfig = RAGConfig()):
+        self.config = config
+        self._stats: Dict[str, _TierStats] = {}
+        self._lock = threading.Lock()
+        logger.info("ModelRouter initialized")
+
+    def route(self, query: str, documents: List[NodeWithScore], cache_similarity: float | None = None) -> RoutingDecision:
+        start = time.perf_counter()
+
+        query_words = len(query.split())
+        # FAISS returns squared L2 distances, which for normalized e5 vectors map to cosine similarity as 1 - d/2
+        similarities = [1.0 - document.score / 2 for document in documents if document.score is not None]
+        # a clear best hit stands out from the rest, a flat distribution means the question is ambiguous or broad
+        score_spread = max(similarities) - sum(similarities) / len(similarities) if len(similarities) > 1 else None
+
+        difficulty = 0
+        if query_words <= self.config.ROUTING_SHORT_QUERY_WORDS:
+            difficulty -= 1
+        elif query_words >= self.config.ROUTING_LONG_QUERY_WORDS:
+            difficulty += 1
+        if score_spread is not None:
+            if score_spread >= self.config.ROUTING_CLEAR_SCORE_SPREAD:
+                difficulty -= 1
+            elif score_spread < self.config.ROUTING_FLAT_SCORE_SPREAD:
+                difficulty += 1
+        # a near miss in the semantic cache means a similar question has been answered before
+        if cache_similarity is not None and cache_similarity >= self.config.ROUTING_CACHE_NEAR_MISS:
+            difficulty -= 1
+
+        if difficulty <= -2:
+            tier = "easy"
+        elif difficulty >= 2:
+            tier = "hard"
+        else:
+            tier = "medium"
+
+        decision = RoutingDecision(
+            tier=tier,
+            model=self.config.ROUTING_MODELS[tier],
+            think=self.config.ROUTING_THINK[tier],
+            difficulty=difficulty,
+            signals={"query_words": query_words, "score_spread": score_spread, "cache_similarity": cache_similarity},
+            routing_time=time.perf_counter() - start
+        )
+        logger.info(
+            f"Routed query to {decision.model} ({tier}, think={decision.think}, difficulty {difficulty}) "
+            f"in {decision.routing_time * 1000:.2f}ms: {decision.signals}"
+        )
+        return decision
+
+    def record(self, decision: RoutingDecision, latency: float, model: str | None = None) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(decision.tier, _TierStats())
+            stats.requests += 1
+            stats.total_latency += latency
+
+        logger.info(f"Routed {decision.tier} request answered by {model or decision.model} in {latency:.2f}s")
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                tier: {
+                    "model": self.config.ROUTING_MODELS[tier],
+                    "requests": stats.requests,
+                    "mean_latency": stats.total_latency / stats.requests if stats.requests else 0.0
+                }
+                for tier, stats in self._stats.items()
+            }
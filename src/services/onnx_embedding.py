@@ -0,0 +1,178 @@
+from pathlib import Path
+from typing import Any, List
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+
+from config.logger_config import setup_logger
+from src.core.exceptions import IndexingError
+from config.config import RAGConfig
+
+logger = setup_logger(__name__)
+
+FP32_MODEL_FILENAME = "model.onnx"
+INT8_MODEL_FILENAME = "model.int8.onnx"
+
+PARITY_SAMPLE_TEXTS = [
+    "query: Was versteht man unter dem Römischen Index?",
+    "query: Wann wurde der Buchdruck mit beweglichen Lettern erfunden?",
+    "passage: Die Ausstellung zeigt die Entwicklung der Schrift von den ersten Keilschrifttafeln bis zu digitalen Medien.",
+    "passage: Johannes Gutenberg druckte um 1454 in Mainz die zweiundvierzigzeilige Bibel.",
+    "passage: Der Index Librorum Prohibitorum verzeichnete Bücher, deren Lektüre der Kirche als gefährlich galt."
+]
+
+class OnnxEmbedding(BaseEmbedding):
+
+    model_path: str = Field(description="Path to the ONNX model file")
+    num_threads: int = Field(default=0, description="Intra-op threads, 0 lets onnxruntime decide")
+    max_length: int = Field(default=512, description="Maximum number of tokens per text")
+
+    _session: Any = PrivateAttr()
+    _tokenizer: Any = PrivateAttr()
+    _input_names: List[str] = PrivateAttr()
+
+    def __init__(self, model_path: str, model_name: str, num_threads: int = 0, embed_batch_size: int = 64, **kwargs: Any):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        super().__init__(
+            model_path=model_path,
+            model_name=model_name,
+            num_threads=num_threads,
+            embed_batch_size=embed_batch_size,
+            **kwargs
+        )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+
+        self._session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._tokenizer = AutoTokenizer.from_pretrained(str(Path(model_path).parent))
+        self._input_names = [model_input.name for model_input in self._session.get_inputs()]
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "OnnxEmbedding"
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        encoded = self._tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="np"
+        )
+        inputs = {name: encoded[name].astype(np.int64) for name in self._input_names}
+        hidden_states = self._session.run(None, inputs)[0]
+
+        # mean pooling over real tokens followed by L2 normalisation, as for the PyTorch model
+        mask = encoded["attention_mask"][..., np.newaxis].astype(np.float32)
+        pooled = (hidden_states * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.tolist()
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed([query])[0]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+    def get_query_embedding_batch(self, queries: List[str]) -> List[List[float]]:
+        # queries and passages share the forward pass, the e5 prefix is part of the text
+        return self._embed(queries)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts)
+
+def export_quantized_model(model_name: str, output_dir: str) -> Path:
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    try:
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+        logger.info(f"Exporting {model_name} to ONNX in {output_path}")
+
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModel.from_pretrained(model_name).eval()
+
+        sample = tokenizer(PARITY_SAMPLE_TEXTS[:2], padding=True, return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+
+        fp32_path = output_path / FP32_MODEL_FILENAME
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[name] for name in input_names),
+                str(fp32_path),
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14
+            )
+
+        int8_path = output_path / INT8_MODEL_FILENAME
+        quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+        tokenizer.save_pretrained(str(output_path))
+
+        logger.info(f"Quantized ONNX model written to {int8_path}")
+        return int8_path
+
+    except Exception as e:
+        logger.error(f"Error exporting ONNX model: {str(e)}")
+        raise IndexingError(f"Failed to export ONNX model: {str(e)}")
+
+def check_parity(onnx_model: BaseEmbedding, reference_model: BaseEmbedding, min_cosine: float) -> float:
+    # retrieval embeds queries through the query path, which a model may handle differently from passages
+    queries = [text for text in PARITY_SAMPLE_TEXTS if text.startswith("query: ")]
+    onnx_vectors = np.asarray(
+        onnx_model.get_text_embedding_batch(PARITY_SAMPLE_TEXTS) + [onnx_model.get_query_embedding(query) for query in queries],
+        dtype=np.float32
+    )
+    reference_vectors = np.asarray(
+        reference_model.get_text_embedding_batch(PARITY_SAMPLE_TEXTS) + [reference_model.get_query_embedding(query) for query in queries],
+        dtype=np.float32
+    )
+
+    cosine = (onnx_vectors * reference_vectors).sum(axis=1) / (
+        np.linalg.norm(onnx_vectors, axis=1) * np.linalg.norm(reference_vectors, axis=1)
+    )
+    worst = float(cosine.min())
+    logger.info(f"ONNX parity check: min cosine {worst:.4f}, mean cosine {float(cosine.mean()):.4f}")
+
+    if worst < min_cosine:
+        raise IndexingError(f"ONNX embeddings deviate from PyTorch (min cosine {worst:.4f} < {min_cosine})")
+    return worst
+
+def load_onnx_embedding(config: RAGConfig) -> OnnxEmbedding:
+    model_path = Path(config.ONNX_MODEL_DIR) / INT8_MODEL_FILENAME
+    exported = not model_path.exists()
+    if exported:
+        export_quantized_model(config.EMBEDDING_MODEL, config.ONNX_MODEL_DIR)
+
+    onnx_model = OnnxEmbedding(
+        model_path=str(model_path),
+        model_name=config.EMBEDDING_MODEL,
+        num_threads=config.ONNX_NUM_THREADS,
+        embed_batch_size=config.EMBED_BATCH_SIZE
+    )
+
+    if exported:
+        from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+        reference_model = HuggingFaceEmbedding(model_name=config.EMBEDDING_MODEL)
+        try:
+            check_parity(onnx_model, reference_model, config.ONNX_PARITY_MIN_COSINE)
+        except IndexingError:
+            model_path.unlink(missing_ok=True)
+            raise
+
+    return onnx_model
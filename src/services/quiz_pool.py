@@ -0,0 +1,78 @@
+import random
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from config.logger_config import setup_logger
+from config.config import RAGConfig
+
+logger = setup_logger(__name__)
+
+class QuizPool:
+
+    def __init__(self, config: RAGConfig = RAGConfig()):
+        self.config = config
+        self._pools: OrderedDict[Tuple[int, str], List[Dict]] = OrderedDict()
+        self._index_version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.top_ups = 0
+        logger.info("QuizPool initialized")
+
+    def normalize_topic(self, interests: str) -> str:
+        words = re.findall(r"\w+", interests.lower())
+        return " ".join(words)
+
+    def take(self, index_version, topic: str, num_questions: int) -> List[Dict]:
+        with self._lock:
+            questions = self._pools.get((index_version, topic), [])
+            if questions:
+                self._pools.move_to_end((index_version, topic))
+            selection = random.sample(questions, min(num_questions, len(questions)))
+            if len(selection) == num_questions:
+                self.hits += 1
+            else:
+                self.top_ups += 1
+
+        if selection:
+            logger.info(f"Quiz pool served {len(selection)}/{num_questions} questions for topic '{topic[:50]}'")
+        return selection
+
+    def questions(self, index_version, topic: str) -> List[Dict]:
+        with self._lock:
+            return list(self._pools.get((index_version, topic), []))
+
+    def add(self, index_version, topic: str, questions: List[Dict]) -> None:
+        with self._lock:
+            # questions generated against an index that has since been replaced are dropped
+            if index_version != self._index_version:
+                return
+
+            pool = self._pools.setdefault((index_version, topic), [])
+            known = {question["question"].strip().lower() for question in pool}
+            for question in questions:
+                if question["question"].strip().lower() not in known:
+                    known.add(question["question"].strip().lower())
+                    pool.append(question)
+            del pool[:-self.config.QUIZ_POOL_MAX_QUESTIONS]
+
+            self._pools.move_to_end((index_version, topic))
+            while len(self._pools) > self.config.QUIZ_POOL_MAX_TOPICS:
+                self._pools.popitem(last=False)
+
+    def invalidate(self, index_version) -> None:
+        with self._lock:
+            dropped = len(self._pools)
+            self._pools.clear()
+            self._index_version = index_version
+        logger.info(f"Quiz pool invalidated for index version {index_version} ({dropped} topics dropped)")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "topics": len(self._pools),
+                "questions": sum(len(questions) for questions in self._pools.values()),
+                "hits": self.hits,
+                "top_ups": self.top_ups
+            }
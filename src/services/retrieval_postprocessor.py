@@ -0,0 +1,131 @@
+from typing import Dict, List, Sequence
+
+import numpy as np
+from llama_index.core.schema import NodeWithScore
+
+from config.logger_config import setup_logger
+from config.config import RAGConfig
+
+logger = setup_logger(__name__)
+
+MIN_OVERLAP_CHARS = 10
+
+class RetrievalPostprocessor:
+
+    def __init__(self, config: RAGConfig = RAGConfig()):
+        self.config = config
+        logger.info("RetrievalPostprocessor initialized")
+
+    def fetch_k(self, top_k: int) -> int:
+        # MMR needs more candidates than it returns to have something to choose from
+        if self.config.RETRIEVAL_MMR_ENABLED:
+            return top_k * self.config.RETRIEVAL_MMR_FETCH_FACTOR
+        return top_k
+
+    def process(self, index, documents: List[NodeWithScore], top_k: int,
+                query_embedding: Sequence[float] | None = None) -> List[NodeWithScore]:
+        if len(documents) < 2:
+            return documents
+
+        candidate_count = len(documents)
+        vectors = self._get_vectors(index, documents)
+        if vectors is None:
+            return documents[:top_k]
+
+        keep = self._remove_near_duplicates(vectors)
+        documents, vectors = [documents[i] for i in keep], vectors[keep]
+
+        groups = self._group_adjacent(documents) if self.config.RETRIEVAL_MERGE_ADJACENT else [[i] for i in range(len(documents))]
+        merged = [self._merge_group(documents, group) for group in groups]
+        group_vectors = self._normalize(np.stack([vectors[group].mean(axis=0) for group in groups]))
+
+        if self.config.RETRIEVAL_MMR_ENABLED and query_embedding is not None:
+            order = self._mmr(group_vectors, np.asarray(query_embedding, dtype=np.float32), top_k)
+            merged = [merged[i] for i in order]
+
+        logger.info(
+            f"Post-processed retrieval: {candidate_count} candidates, {candidate_count - len(keep)} near-duplicates "
+            f"removed, {len(merged)} documents returned"
+        )
+        return merged
+
+    def _get_vectors(self, index, documents: List[NodeWithScore]) -> np.ndarray | None:
+        vector_store = index.vector_store
+        try:
+            faiss_ids = [vector_store._node_id_to_faiss_id_map[doc.node.node_id] for doc in documents]
+            vectors = np.stack([vector_store.client.reconstruct(int(faiss_id)) for faiss_id in faiss_ids])
+        except Exception as e:
+            # re-embedding every candidate would cost more than the post-processing saves
+            logger.warning(f"Could not reconstruct vectors from the index, skipping post-processing: {str(e)}")
+            return None
+        return self._normalize(vectors.astype(np.float32))
+
+    def _remove_near_duplicates(self, vectors: np.ndarray) -> List[int]:
+        keep: List[int] = []
+        for i in range(len(vectors)):
+            # documents are in relevance order, so the better ranked copy survives
+            if keep and float((vectors[keep] @ vectors[i]).max()) >= self.config.RETRIEVAL_DEDUP_THRESHOLD:
+                continue
+            keep.append(i)
+        return keep
+
+    def _group_adjacent(self, documents: List[NodeWithScore]) -> List[List[int]]:
+        positions = {doc.node.node_id: i for i, doc in enumerate(documents)}
+        next_of: Dict[int, int] = {}
+        has_prev = set()
+
+        for i, doc in enumerate(documents):
+            next_node = doc.node.next_node
+            if next_node is not None and next_node.node_id in positions:
+                next_of[i] = positions[next_node.node_id]
+                has_prev.add(positions[next_node.node_id])
+
+        groups = []
+        for head in range(len(documents)):
+            if head in has_prev:
+                continue
+            group = [head]
+            while group[-1] in next_of:
+                group.append(next_of[group[-1]])
+            groups.append(group)
+
+        # a group takes the rank of its best document
+        return sorted(groups, key=min)
+
+    def _merge_group(self, documents: List[NodeWithScore], group: List[int]) -> NodeWithScore:
+        if len(group) == 1:
+            return documents[group[0]]
+
+        text = documents[group[0]].get_text()
+        for i in group[1:]:
+            text = self._merge_texts(text, documents[i].get_text())
+
+        best = documents[min(group)]
+        node = documents[group[0]].node.model_copy(update={"text": text})
+        return NodeWithScore(node=node, score=best.score)
+
+    def _merge_texts(self, first: str, second: str) -> str:
+        # consecutive chunks share CHUNK_OVERLAP tokens, which must not be repeated
+        for size in range(min(len(first), len(second)), MIN_OVERLAP_CHARS - 1, -1):
+            if first.endswith(second[:size]):
+                return first + second[size:]
+        return f"{first} {second}"
+
+    def _mmr(self, vectors: np.ndarray, query_embedding: np.ndarray, top_k: int) -> List[int]:
+        relevance = vectors @ self._normalize(query_embedding[np.newaxis])[0]
+        weight = self.config.RETRIEVAL_MMR_LAMBDA
+        selected: List[int] = []
+        candidates = list(range(len(vectors)))
+
+        while candidates and len(selected) < top_k:
+            if selected:
+                redundancy = (vectors[candidates] @ vectors[selected].T).max(axis=1)
+            else:
+                redundancy = np.zeros(len(candidates), dtype=np.float32)
+            scores = weight * relevance[candidates] - (1 - weight) * redundancy
+            selected.append(candidates.pop(int(np.argmax(scores))))
+
+        return selected
+
+    def _normalize(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
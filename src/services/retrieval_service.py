@@ -1,35 +1,204 @@
-from typing import List
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Tuple
+import numpy as np
 from llama_index.core.retrievers import VectorIndexRetriever
-from llama_index.core.schema import NodeWithScore
+from llama_index.core.schema import NodeWithScore, QueryBundle
 
 from config.logger_config import setup_logger
 from src.core.exceptions import RetrievalError
+from src.services.retrieval_postprocessor import RetrievalPostprocessor
 from config.config import RAGConfig
 
 logger = setup_logger(__name__)
 
+class LRUCache:
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
 class RetrievalService:
 
     def __init__(self, config: RAGConfig = RAGConfig()):
         self.config = config
+        # query embeddings only depend on the embedding model, results also on the index they came from
+        self.embedding_cache = LRUCache(config.QUERY_EMBEDDING_CACHE_SIZE)
+        self.result_cache = LRUCache(config.RETRIEVAL_CACHE_SIZE)
+        self.postprocessor = RetrievalPostprocessor(config)
+        self._index_version = None
         logger.info("RetrievalService initialized")
 
-    def retrieve_documents(self, index, query: str, top_k: int | None = None) -> List[NodeWithScore]:
+    def set_index_version(self, index_version) -> None:
+        self._index_version = index_version
+        self.result_cache.clear()
+        logger.info(f"Retrieval result cache invalidated for index version {index_version}")
+
+    def cache_stats(self) -> Dict[str, Dict[str, float]]:
+        return {"query_embeddings": self.embedding_cache.stats(), "results": self.result_cache.stats()}
+
+    def embed_query(self, index, query: str) -> List[float]:
+        try:
+            embedding = self.embedding_cache.get(query)
+            if embedding is None:
+                embedding = index._embed_model.get_query_embedding(f"query: {query}")
+                self.embedding_cache.put(query, embedding)
+            return embedding
+
+        except Exception as e:
+            logger.error(f"Error embedding query: {str(e)}")
+            raise RetrievalError(f"Failed to embed query: {str(e)}")
+
+    def embed_queries(self, index, queries: List[str]) -> np.ndarray:
+        try:
+            embeddings = [self.embedding_cache.get(query) for query in queries]
+            missing = list(dict.fromkeys(query for query, embedding in zip(queries, embeddings) if embedding is None))
+
+            if missing:
+                # both methods share the cache, so batches must go through the query path like embed_query
+                new_embeddings = self._embed_query_batch(index._embed_model, [f"query: {query}" for query in missing])
+                for query, embedding in zip(missing, new_embeddings):
+                    self.embedding_cache.put(query, embedding)
+                computed = dict(zip(missing, new_embeddings))
+                embeddings = [embedding if embedding is not None else computed[query] for query, embedding in zip(queries, embeddings)]
+
+            return np.asarray(embeddings, dtype=np.float32)
+
+        except Exception as e:
+            logger.error(f"Error embedding queries: {str(e)}")
+            raise RetrievalError(f"Failed to embed queries: {str(e)}")
+
+    def _embed_query_batch(self, embed_model, queries: List[str]) -> List[List[float]]:
+        get_query_embedding_batch = getattr(embed_model, "get_query_embedding_batch", None)
+        if get_query_embedding_batch is not None:
+            return get_query_embedding_batch(queries)
+        return [embed_model.get_query_embedding(query) for query in queries]
+
+    def retrieve_documents(self, index, query: str, top_k: int | None = None, query_embedding: List[float] | None = None,
+                           index_version=None) -> List[NodeWithScore]:
         try:
             k = top_k or self.config.DEFAULT_TOP_K
+            fetch_k = self.postprocessor.fetch_k(k)
             logger.info(f"Retrieving top-{k} documents for query: '{query[:50]}...'")
-            
-            retriever = VectorIndexRetriever(
-                index=index,
-                similarity_top_k=k,
-                embed_model=index._embed_model
-            )
-            
-            retrieved_docs = retriever.retrieve(f"query: {query}")
-            
-            logger.info(f"Retrieved {len(retrieved_docs)} documents")
-            return retrieved_docs
-        
+
+            # a precomputed embedding is reused instead of embedding the query a second time
+            if query_embedding is None:
+                query_embedding = self.embed_query(index, query)
+
+            cached_hits = self._get_cached_hits(index_version, query, fetch_k)
+            if cached_hits is not None:
+                logger.info(f"Retrieval cache hit, {len(cached_hits)} documents")
+                retrieved_docs = self._load_nodes(index, [cached_hits])[0]
+            else:
+                retriever = VectorIndexRetriever(
+                    index=index,
+                    similarity_top_k=fetch_k,
+                    embed_model=index._embed_model
+                )
+                retrieved_docs = retriever.retrieve(QueryBundle(query_str=f"query: {query}", embedding=query_embedding))
+                self._cache_hits(index_version, query, fetch_k, [(doc.node.node_id, doc.score) for doc in retrieved_docs])
+
+            documents = self.postprocessor.process(index, retrieved_docs, k, query_embedding)
+
+            logger.info(f"Retrieved {len(documents)} documents")
+            return documents
+
         except Exception as e:
             logger.error(f"Error during retrieval: {str(e)}")
-            raise RetrievalError(f"Failed to retrieve documents: {str(e)}")
\ No newline at end of file
+            raise RetrievalError(f"Failed to retrieve documents: {str(e)}")
+
+    def retrieve_batch(self, index, queries: List[str], top_k: int | None = None, index_version=None) -> List[List[NodeWithScore]]:
+        try:
+            k = top_k or self.config.DEFAULT_TOP_K
+            fetch_k = self.postprocessor.fetch_k(k)
+            logger.info(f"Retrieving top-{k} documents for {len(queries)} queries")
+
+            if not queries:
+                return []
+
+            query_matrix = self.embed_queries(index, queries)
+            hits = [self._get_cached_hits(index_version, query, fetch_k) for query in queries]
+            missing = [i for i, query_hits in enumerate(hits) if query_hits is None]
+
+            if missing:
+                searched = self._search_hits(index, query_matrix[missing], fetch_k)
+                for i, query_hits in zip(missing, searched):
+                    self._cache_hits(index_version, queries[i], fetch_k, query_hits)
+                    hits[i] = query_hits
+
+            results = [
+                self.postprocessor.process(index, documents, k, query_embedding)
+                for documents, query_embedding in zip(self._load_nodes(index, hits), query_matrix)
+            ]
+            logger.info(f"Retrieved {sum(len(row) for row in results)} documents for {len(results)} queries")
+            return results
+
+        except RetrievalError:
+            raise
+        except Exception as e:
+            logger.error(f"Error during batch retrieval: {str(e)}")
+            raise RetrievalError(f"Failed to retrieve documents: {str(e)}")
+
+    def search_batch(self, index, query_matrix: np.ndarray, top_k: int) -> List[List[NodeWithScore]]:
+        return self._load_nodes(index, self._search_hits(index, query_matrix, top_k))
+
+    def _search_hits(self, index, query_matrix: np.ndarray, top_k: int) -> List[List[Tuple[str, float]]]:
+        vector_store = index.vector_store
+        distances, faiss_ids = vector_store.client.search(np.ascontiguousarray(query_matrix, dtype=np.float32), top_k)
+
+        id_map = vector_store._faiss_id_to_node_id_map
+        return [
+            [(id_map[faiss_id], float(distance)) for faiss_id, distance in zip(row_ids, row_distances) if faiss_id >= 0]
+            for row_ids, row_distances in zip(faiss_ids.tolist(), distances.tolist())
+        ]
+
+    def _load_nodes(self, index, hits: List[List[Tuple[str, float]]]) -> List[List[NodeWithScore]]:
+        # every node is fetched from the docstore once, even if several queries hit it
+        unique_node_ids = list(dict.fromkeys(node_id for row in hits for node_id, _ in row))
+        nodes = dict(zip(unique_node_ids, index.docstore.get_nodes(unique_node_ids)))
+
+        return [[NodeWithScore(node=nodes[node_id], score=score) for node_id, score in row] for row in hits]
+
+    def _get_cached_hits(self, index_version, query: str, top_k: int) -> List[Tuple[str, float]] | None:
+        if index_version is None:
+            return None
+        return self.result_cache.get((index_version, query, top_k))
+
+    def _cache_hits(self, index_version, query: str, top_k: int, hits: List[Tuple[str, float]]) -> None:
+        # results of a query that raced an index swap are not cached under the new version
+        if index_version is not None and index_version == self._index_version:
+            self.result_cache.put((index_version, query, top_k), hits)
@@ -0,0 +1,74 @@
+from typing import Any, Dict, List, Sequence, Tuple
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.node_parser.node_utils import build_nodes_from_splits
+from llama_index.core.schema import BaseNode, MetadataMode
+from llama_index.core.utils import get_tqdm_iterable
+
+from config.logger_config import setup_logger
+from src.services.document_processor import DocumentProcessor
+
+logger = setup_logger(__name__)
+
+SECTION_TITLES_KEY = "section_titles"
+
+class SectionSplitter(SentenceSplitter):
+
+    # chunks follow the sections DocumentProcessor recovered: consecutive short sections share a chunk,
+    # a section is only cut with the sentence splitter when it does not fit into one chunk on its own
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "SectionSplitter"
+
+    def _parse_nodes(self, nodes: Sequence[BaseNode], show_progress: bool = False, **kwargs: Any) -> List[BaseNode]:
+        all_nodes: List[BaseNode] = []
+        nodes_with_progress = get_tqdm_iterable(nodes, show_progress, "Parsing sections")
+
+        for node in nodes_with_progress:
+            # the document's metadata is embedded with every chunk, so it counts against the chunk size
+            metadata_str = self._get_metadata_str(node)
+            sections = DocumentProcessor.parse_sections(node.get_content(metadata_mode=MetadataMode.NONE))
+            chunks = self._chunk_sections(sections, metadata_str)
+
+            section_nodes = build_nodes_from_splits([text for _, text in chunks], node, id_func=self.id_func)
+            for section_node, (titles, _) in zip(section_nodes, chunks):
+                # the headings are already part of the text, the metadata only records them
+                section_node.metadata[SECTION_TITLES_KEY] = titles
+                section_node.excluded_embed_metadata_keys = [*section_node.excluded_embed_metadata_keys, SECTION_TITLES_KEY]
+                section_node.excluded_llm_metadata_keys = [*section_node.excluded_llm_metadata_keys, SECTION_TITLES_KEY]
+            all_nodes.extend(section_nodes)
+
+        return all_nodes
+
+    def _chunk_sections(self, sections: List[Dict], metadata_str: str = "") -> List[Tuple[List[str], str]]:
+        chunks: List[Tuple[List[str], str]] = []
+        current_titles: List[str] = []
+        current_text = ""
+
+        for section in sections:
+            text = "\n".join([f"# {section['title']}"] + section["text"])
+            if current_text:
+                candidate = f"{current_text}\n{text}"
+                if self._fits(candidate, metadata_str):
+                    current_titles, current_text = current_titles + [section["title"]], candidate
+                    continue
+                chunks.append((current_titles, current_text))
+                current_titles, current_text = [], ""
+
+            if self._fits(text, metadata_str):
+                current_titles, current_text = [section["title"]], text
+            else:
+                chunks.extend(self._split_section(section, metadata_str))
+
+        if current_text:
+            chunks.append((current_titles, current_text))
+        return chunks
+
+    def _split_section(self, section: Dict, metadata_str: str) -> List[Tuple[List[str], str]]:
+        # every piece keeps the heading, so it still says which section it was cut from
+        heading = f"# {section['title']}"
+        pieces = self.split_text_metadata_aware("\n".join(section["text"]), f"{metadata_str}\n{heading}" if metadata_str else heading)
+        return [([section["title"]], f"{heading}\n{piece}") for piece in pieces]
+
+    def _fits(self, text: str, metadata_str: str) -> bool:
+        return self._token_size(text) + self._token_size(metadata_str) <= self.chunk_size
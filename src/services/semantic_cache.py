@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from llama_index.core.schema import NodeWithScore
+
+from config.logger_config import setup_logger
+from config.config import RAGConfig
+
+logger = setup_logger(__name__)
+
+@dataclass
+class CachedAnswer:
+    query: str
+    embedding: np.ndarray
+    answer: str
+    documents: List[NodeWithScore]
+    created_at: float
+
+@dataclass
+class SemanticCacheHit:
+    query: str
+    answer: str
+    documents: List[NodeWithScore]
+    similarity: float
+    model: str
+
+class SemanticCache:
+
+    def __init__(self, config: RAGConfig = RAGConfig()):
+        self.config = config
+        self.threshold = config.SEMANTIC_CACHE_THRESHOLD
+        self.ttl = config.SEMANTIC_CACHE_TTL_SECONDS
+        self.max_entries = config.SEMANTIC_CACHE_MAX_ENTRIES
+        self._entries: OrderedDict[Tuple[str, int, int], CachedAnswer] = OrderedDict()
+        self._next_id = 0
+        self._index_version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        logger.info("SemanticCache initialized")
+
+    def lookup(self, index_version, model: str | None, top_k: int, embedding: Sequence[float]) -> SemanticCacheHit | None:
+        with self._lock:
+            if index_version != self._index_version:
+                self.misses += 1
+                return None
+
+            best_key, best_similarity = self._nearest(model, top_k, self._normalize(embedding))
+            if best_key is None or best_similarity < self.threshold:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_key)
+            entry = self._entries[best_key]
+            self.hits += 1
+
+        logger.info(f"Semantic cache hit (cosine {best_similarity:.3f}) for query: '{entry.query[:50]}...'")
+        return SemanticCacheHit(
+            query=entry.query,
+            answer=entry.answer,
+            documents=entry.documents,
+            similarity=best_similarity,
+            model=best_key[0]
+        )
+
+    def nearest_similarity(self, index_version, model: str | None, top_k: int, embedding: Sequence[float]) -> float | None:
+        with self._lock:
+            if index_version != self._index_version:
+                return None
+            best_key, best_similarity = self._nearest(model, top_k, self._normalize(embedding))
+        return best_similarity if best_key is not None else None
+
+    def store(self, index_version, model: str, top_k: int, query: str, embedding: Sequence[float],
+              answer: str, documents: List[NodeWithScore]) -> None:
+        if not answer:
+            return
+
+        with self._lock:
+            # answers generated against an index that has since been replaced are dropped
+            if index_version != self._index_version:
+                return
+
+            key = (model, top_k, self._next_id)
+            self._next_id += 1
+            self._entries[key] = CachedAnswer(
+                query=query,
+                embedding=self._normalize(embedding),
+                answer=answer,
+                documents=documents,
+                created_at=time.time()
+            )
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, index_version) -> None:
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            self._index_version = index_version
+        logger.info(f"Semantic cache invalidated for index version {index_version} ({dropped} answers dropped)")
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _nearest(self, model: str | None, top_k: int, query_vector: np.ndarray) -> Tuple[Tuple[str, int, int] | None, float]:
+        # callers hold the lock; a model of None matches answers from every model
+        now = time.time()
+        best_key, best_similarity = None, -1.0
+        for key, entry in list(self._entries.items()):
+            if now - entry.created_at > self.ttl:
+                del self._entries[key]
+                continue
+            if key[1] != top_k or (model is not None and key[0] != model):
+                continue
+            similarity = float(np.dot(query_vector, entry.embedding))
+            if similarity > best_similarity:
+                best_key, best_similarity = key, similarity
+        return best_key, best_similarity
+
+    def _normalize(self, embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
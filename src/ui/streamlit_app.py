@@ -1,6 +1,6 @@
 import streamlit as st
-import json
 import traceback
+import uuid
 from pathlib import Path
 import sys
 
@@ -88,6 +88,15 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+@st.cache_resource(show_spinner=False)
+def get_shared_rag_system() -> RAGSystem:
+    # built once per server process and shared by every browser session
+    rag_system = RAGSystem(RAGConfig())
+    rag_system.initialize_system()
+    logger.info("Shared RAG System created")
+    return rag_system
+
+
 class StreamlitUI:
     
     def __init__(self):
@@ -102,6 +111,10 @@ class StreamlitUI:
             st.session_state.system_ready = False
             st.session_state.initialization_error = None
         
+        # identifies this browser session towards the backend so its conversation summary can be kept
+        if "session_id" not in st.session_state:
+            st.session_state.session_id = uuid.uuid4().hex
+        
         # Chatbot state
         if "chatbot_messages" not in st.session_state:
             st.session_state.chatbot_messages = []
@@ -115,6 +128,8 @@ class StreamlitUI:
             st.session_state.quiz_submitted = False
         if "quiz_score" not in st.session_state:
             st.session_state.quiz_score = None
+        if "quiz_requested" not in st.session_state:
+            st.session_state.quiz_requested = 0
         
         # Character conversation state
         if "character_messages" not in st.session_state:
@@ -126,8 +141,7 @@ class StreamlitUI:
         if st.session_state.rag_system is None:
             try:
                 with st.spinner("RAG-System wird initialisiert..."):
-                    st.session_state.rag_system = RAGSystem(self.config)
-                    st.session_state.rag_system.initialize_system()
+                    st.session_state.rag_system = get_shared_rag_system()
                     st.session_state.system_ready = True
                     st.session_state.initialization_error = None
                     st.success("System erfolgreich initialisiert!")
@@ -196,6 +210,7 @@ class StreamlitUI:
                 )
 
             model_options = {
+                "auto": "Automatisch",
                 "qwen3:0.6b": "Qwen3:0.6B",
                 "qwen3:1.7b": "Qwen3:1.7b",
                 "qwen3:8b": "Qwen3:8b"
@@ -204,7 +219,7 @@ class StreamlitUI:
             selected_model = st.selectbox(
                 "Sprachmodell wählen:",
                 list(model_options.keys()),
-                index=1,
+                index=2,
                 format_func=lambda x: model_options[x],
                 help="Wählen Sie das Sprachmodell, welches die Antwort generieren soll."
             )
@@ -248,21 +263,46 @@ class StreamlitUI:
                 st.markdown(prompt)
             
             with st.chat_message("assistant"):
-                with st.spinner("Antwort wird generiert..."):
-                    try:
-                        response = st.session_state.rag_system.chatbot_endpoint(
+                try:
+                    with st.spinner("Dokumente werden gesucht..."):
+                        response = st.session_state.rag_system.chatbot_stream_endpoint(
                             query=prompt,
                             conversation_history=st.session_state.chatbot_messages[:-1],
                             model=st.session_state.selected_model,
-                            top_k=st.session_state.top_k
+                            top_k=st.session_state.top_k,
+                            session_id=st.session_state.session_id
                         )
-                        st.markdown(response['answer'])
-                        st.session_state.chatbot_messages.append({"role": "assistant", "content": response['answer']})
-                    except Exception as e:
-                        error_msg = f"Fehler beim Generieren der Antwort: {str(e)}"
-                        st.error(error_msg)
-                        st.session_state.chatbot_messages.append({"role": "assistant", "content": error_msg})
-                        logger.error(f"Chatbot error: {str(e)}")
+                    thinking_status = st.status("Antwort wird generiert...", expanded=False)
+                    answer = st.write_stream(self.stream_answer(response['stream'], thinking_status))
+                    st.session_state.chatbot_messages.append({"role": "assistant", "content": answer})
+                except Exception as e:
+                    error_msg = f"Fehler beim Generieren der Antwort: {str(e)}"
+                    st.error(error_msg)
+                    st.session_state.chatbot_messages.append({"role": "assistant", "content": error_msg})
+                    logger.error(f"Chatbot error: {str(e)}")
+    
+    def stream_answer(self, stream, thinking_status):
+        thinking_placeholder = thinking_status.empty()
+        thinking = ""
+        answering = False
+        
+        for chunk in stream:
+            if chunk["type"] == "thinking":
+                thinking += chunk["content"]
+                thinking_placeholder.markdown(thinking)
+            elif chunk["type"] == "answer":
+                if not answering:
+                    thinking_status.update(label="Gedankengang", state="complete")
+                    answering = True
+                yield chunk["content"]
+            elif chunk["type"] == "done":
+                logger.info(
+                    f"Queue wait: {chunk.get('queue_wait', 0):.2f}s, "
+                    f"time to first token: {chunk['time_to_first_token'] or 0:.2f}s"
+                )
+        
+        if not answering:
+            thinking_status.update(label="Gedankengang", state="complete")
     
     def render_quiz_page(self):
         """Rendert die Quiz-Generator-Seite."""
@@ -316,33 +356,24 @@ class StreamlitUI:
     def generate_quiz(self, interests: str, num_questions: int):
         try:
             with st.spinner("Quiz wird generiert..."):
-                quiz_json = st.session_state.rag_system.quiz_endpoint(
+                questions = st.session_state.rag_system.quiz_endpoint(
                     interests=interests,
                     model=st.session_state.selected_model,
                     num_questions=num_questions,
                     top_k=st.session_state.top_k
                 )
                 
-                quiz_lines = quiz_json.strip().split('\n')
-                questions = []
-                
-                for line in quiz_lines:
-                    if line.strip():
-                        try:
-                            question_data = json.loads(line)
-                            questions.append(question_data)
-                        except json.JSONDecodeError:
-                            continue
-                
                 if questions:
                     st.session_state.quiz_questions = questions
                     st.session_state.quiz_answers = {}
                     st.session_state.quiz_submitted = False
                     st.session_state.quiz_score = None
+                    st.session_state.quiz_shuffled_options = None
+                    st.session_state.quiz_requested = num_questions
                     st.success(f"Quiz mit {len(questions)} Fragen erstellt!")
                     st.rerun()
                 else:
-                    st.error("Fehler beim Parsen der Quiz-Fragen. Versuchen Sie es erneut.")
+                    st.error("Zu diesem Thema konnten keine Quiz-Fragen erstellt werden. Versuchen Sie es mit anderen Interessen.")
                     
         except Exception as e:
             st.error(f"Fehler beim Generieren des Quiz: {str(e)}")
@@ -350,6 +381,12 @@ class StreamlitUI:
     
     def render_quiz_questions(self):
         st.subheader("Ihr personalisiertes Quiz")
+        
+        if len(st.session_state.quiz_questions) < st.session_state.quiz_requested:
+            st.warning(
+                f"Es konnten nur {len(st.session_state.quiz_questions)} von "
+                f"{st.session_state.quiz_requested} Fragen erstellt werden."
+            )
 
         if "quiz_shuffled_options" not in st.session_state or st.session_state.quiz_shuffled_options is None:
             st.session_state.quiz_shuffled_options = {}
@@ -450,6 +487,7 @@ class StreamlitUI:
         st.session_state.quiz_submitted = False
         st.session_state.quiz_score = None
         st.session_state.quiz_shuffled_options = None
+        st.session_state.quiz_requested = 0
     
     def render_character_page(self):
         st.markdown('<div class="main-header">Charakter-Gespräch</div>', 
@@ -512,25 +550,31 @@ class StreamlitUI:
                 st.markdown(prompt)
             
             with st.chat_message("assistant"):
-                with st.spinner(f"{character_options[selected_char]} denkt nach..."):
-                    try:
-                        response = st.session_state.rag_system.character_endpoint(
-                            query=prompt,
-                            character=selected_char,
-                            model=st.session_state.selected_model,
-                            temperature=st.session_state.temperature
-                        )
-                        st.markdown(f"""
+                try:
+                    stream = st.session_state.rag_system.character_stream_endpoint(
+                        query=prompt,
+                        character=selected_char,
+                        model=st.session_state.selected_model,
+                        temperature=st.session_state.temperature,
+                        conversation_history=st.session_state.character_messages[:-1],
+                        session_id=st.session_state.session_id
+                    )
+                    thinking_status = st.status(f"{character_options[selected_char]} denkt nach...", expanded=False)
+                    response_placeholder = st.empty()
+                    response = ""
+                    for token in self.stream_answer(stream, thinking_status):
+                        response += token
+                        response_placeholder.markdown(f"""
                         <div class="character-response">
                             {response}
                         </div>
                         """, unsafe_allow_html=True)
-                        st.session_state.character_messages.append({"role": "assistant", "content": response})
-                    except Exception as e:
-                        error_msg = f"Fehler beim Generieren der Antwort: {str(e)}"
-                        st.error(error_msg)
-                        st.session_state.character_messages.append({"role": "assistant", "content": error_msg})
-                        logger.error(f"Character conversation error: {str(e)}")
+                    st.session_state.character_messages.append({"role": "assistant", "content": response})
+                except Exception as e:
+                    error_msg = f"Fehler beim Generieren der Antwort: {str(e)}"
+                    st.error(error_msg)
+                    st.session_state.character_messages.append({"role": "assistant", "content": error_msg})
+                    logger.error(f"Character conversation error: {str(e)}")
     
     def clear_all_sessions(self):
         keys_to_clear = [
@@ -0,0 +1,76 @@
+from config.config import RAGConfig
+from src.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+MODEL = "qwen3:8b"
+
+
+def _breaker(**overrides):
+    return CircuitBreaker(RAGConfig(LLM_BREAKER_FAILURE_THRESHOLD=3, **overrides))
+
+
+def _trip(breaker):
+    for _ in range(3):
+        breaker.record_failure(MODEL, RuntimeError("connection refused"))
+
+
+def _state(breaker):
+    return breaker.stats()["models"][MODEL]["state"]
+
+
+def test_circuit_opens_after_consecutive_failures():
+    breaker = _breaker(LLM_BREAKER_RESET_SECONDS=30)
+    breaker.record_failure(MODEL, RuntimeError("connection refused"))
+    breaker.record_failure(MODEL, RuntimeError("connection refused"))
+    assert breaker.allow(MODEL)
+
+    breaker.record_failure(MODEL, RuntimeError("connection refused"))
+
+    assert _state(breaker) == OPEN
+    assert not breaker.available(MODEL)
+    assert not breaker.allow(MODEL)
+
+
+def test_success_resets_the_failure_count():
+    breaker = _breaker()
+    breaker.record_failure(MODEL, RuntimeError("connection refused"))
+    breaker.record_failure(MODEL, RuntimeError("connection refused"))
+    breaker.record_success(MODEL, 1.0)
+    breaker.record_failure(MODEL, RuntimeError("connection refused"))
+
+    assert _state(breaker) == CLOSED
+
+
+def test_slow_calls_count_as_failures():
+    breaker = _breaker(LLM_BREAKER_SLOW_CALL_SECONDS=5.0)
+    for _ in range(3):
+        breaker.record_success(MODEL, 6.0)
+
+    assert _state(breaker) == OPEN
+    assert breaker.stats()["models"][MODEL]["slow_calls"] == 3
+
+
+def test_half_open_circuit_lets_a_single_probe_through():
+    breaker = _breaker(LLM_BREAKER_RESET_SECONDS=0)
+    _trip(breaker)
+
+    assert breaker.allow(MODEL)
+    assert _state(breaker) == HALF_OPEN
+    assert not breaker.allow(MODEL)
+    assert not breaker.available(MODEL)
+
+    breaker.release(MODEL)
+    assert breaker.allow(MODEL)
+
+
+def test_probe_result_closes_or_reopens_the_circuit():
+    breaker = _breaker(LLM_BREAKER_RESET_SECONDS=0)
+    _trip(breaker)
+    breaker.allow(MODEL)
+    breaker.record_success(MODEL, 1.0)
+    assert _state(breaker) == CLOSED
+
+    _trip(breaker)
+    breaker.allow(MODEL)
+    breaker.record_failure(MODEL, RuntimeError("connection refused"))
+    assert _state(breaker) == OPEN
+    assert breaker.stats()["models"][MODEL]["trips"] == 3
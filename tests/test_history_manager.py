@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+
+from config.config import RAGConfig
+from src.services.history_manager import SUMMARY_PREFIX, HistoryManager
+
+
+def _history(turns):
+    # four tokens per message, starting with the user
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"Nachricht {i} über Faust"}
+        for i in range(turns)
+    ]
+
+
+def _manager(summaries):
+    def summarize(previous, messages):
+        summaries.append((previous, messages))
+        return "kurz"
+
+    packer = SimpleNamespace(count_tokens=lambda model, text: len(text.split()))
+    return HistoryManager(RAGConfig(HISTORY_TOKEN_BUDGET=20, HISTORY_FOLD_RATIO=0.5), packer, summarize)
+
+
+def _wait_for_folds(manager):
+    # folds run on a single worker, so anything submitted after them finishes after them
+    manager._executor.submit(lambda: None).result()
+
+
+def test_history_within_budget_is_kept():
+    manager = _manager([])
+    history = _history(4)
+
+    compacted = manager.compact("session:chatbot", history, "qwen3:8b")
+
+    assert compacted.messages == history
+    assert compacted.tokens_saved == 0
+
+
+def test_history_without_a_session_is_trimmed_but_not_summarized():
+    summaries = []
+    manager = _manager(summaries)
+    history = _history(10)
+
+    compacted = manager.compact(None, history, "qwen3:8b")
+    _wait_for_folds(manager)
+
+    # the five newest messages fit, but the tail must not start with an answer
+    assert compacted.messages == history[6:]
+    assert compacted.tokens_saved == 24
+    assert summaries == []
+
+
+def test_evicted_turns_are_folded_into_a_summary():
+    summaries = []
+    manager = _manager(summaries)
+    history = _history(10)
+
+    assert manager.compact("session:chatbot", history, "qwen3:8b").messages == history[6:]
+    _wait_for_folds(manager)
+    compacted = manager.compact("session:chatbot", history, "qwen3:8b")
+
+    assert summaries == [(None, history[:8])]
+    assert compacted.messages == [{"role": "system", "content": f"{SUMMARY_PREFIX}kurz"}] + history[8:]
+    assert compacted.tokens_saved == 31
+    assert manager.stats()["compactions"] == 1
+
+
+def test_a_new_fold_builds_on_the_previous_summary():
+    summaries = []
+    manager = _manager(summaries)
+    history = _history(10)
+    manager.compact("session:chatbot", history, "qwen3:8b")
+    _wait_for_folds(manager)
+
+    longer = history + _history(16)[10:]
+    manager.compact("session:chatbot", longer, "qwen3:8b")
+    _wait_for_folds(manager)
+
+    assert summaries[1][0] == "kurz"
+    assert summaries[1][1][0] == longer[8]
+    assert manager.stats()["compactions"] == 2
+
+
+def test_an_edited_conversation_drops_its_summary():
+    manager = _manager([])
+    history = _history(10)
+    manager.compact("session:chatbot", history, "qwen3:8b")
+    _wait_for_folds(manager)
+
+    edited = [{"role": "user", "content": "Ganz andere Frage"}] + history[1:]
+    compacted = manager.compact("session:chatbot", edited, "qwen3:8b")
+
+    assert compacted.messages[0]["role"] != "system"
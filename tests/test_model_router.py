@@ -0,0 +1,50 @@
+from llama_index.core.schema import NodeWithScore, TextNode
+
+from config.config import RAGConfig
+from src.services.model_router import ModelRouter
+
+SHORT_QUERY = "Wer ist Mephisto?"
+MEDIUM_QUERY = "Wie verändert sich das Verhältnis zwischen Faust und Mephisto im Verlauf der Tragödie?"
+LONG_QUERY = " ".join(["Welche Rolle spielt die Wette zwischen Gott und Mephisto"] * 3)
+
+# squared L2 distances, similarities 0.9/0.8/0.8 and 0.8/0.799/0.798
+CLEAR_SCORES = [0.2, 0.4, 0.4]
+FLAT_SCORES = [0.4, 0.402, 0.404]
+
+
+def _documents(scores):
+    return [NodeWithScore(node=TextNode(text="Faust"), score=score) for score in scores]
+
+
+def _route(query, scores, cache_similarity=None):
+    return ModelRouter(RAGConfig()).route(query, _documents(scores), cache_similarity)
+
+
+def test_short_query_with_a_clear_best_hit_is_easy():
+    decision = _route(SHORT_QUERY, CLEAR_SCORES)
+
+    assert (decision.tier, decision.model, decision.difficulty) == ("easy", "qwen3:0.6b", -2)
+
+
+def test_long_query_with_flat_scores_is_hard():
+    decision = _route(LONG_QUERY, FLAT_SCORES)
+
+    assert (decision.tier, decision.model, decision.difficulty) == ("hard", "qwen3:8b", 2)
+
+
+def test_conflicting_signals_stay_medium():
+    assert _route(SHORT_QUERY, FLAT_SCORES).tier == "medium"
+    assert _route(LONG_QUERY, CLEAR_SCORES).tier == "medium"
+    assert _route(MEDIUM_QUERY, CLEAR_SCORES).tier == "medium"
+
+
+def test_a_single_hit_has_no_score_spread():
+    decision = _route(SHORT_QUERY, [0.2])
+
+    assert decision.signals["score_spread"] is None
+    assert decision.tier == "medium"
+
+
+def test_a_cache_near_miss_makes_the_query_easier():
+    assert _route(SHORT_QUERY, [0.2], cache_similarity=0.9).tier == "easy"
+    assert _route(SHORT_QUERY, [0.2], cache_similarity=0.5).tier == "medium"
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from config.config import RAGConfig
+from src.core.exceptions import LLMError
+from src.services.llm_service import LLMService
+from src.services.quiz_pool import QuizPool
+
+
+def _question(text):
+    return {"question": text, "correct_answer": "Faust", "answer1": "Gretchen", "answer2": "Wagner", "answer3": "Marthe"}
+
+
+def _response(*items):
+    return json.dumps({"questions": list(items)})
+
+
+def test_parse_quiz_questions_strips_fields_and_caps_the_count():
+    questions = LLMService()._parse_quiz_questions(_response(_question(" Wer? "), _question("Wo?"), _question("Wann?")), 2)
+
+    assert [question["question"] for question in questions] == ["Wer?", "Wo?"]
+
+
+def test_parse_quiz_questions_discards_incomplete_items():
+    incomplete = _question("Wo?")
+    del incomplete["answer3"]
+    blank = _question("Wann?")
+    blank["correct_answer"] = "  "
+
+    questions = LLMService()._parse_quiz_questions(_response(_question("Wer?"), incomplete, blank, "Was?"), 5)
+
+    assert [question["question"] for question in questions] == ["Wer?"]
+
+
+def test_parse_quiz_questions_rejects_invalid_json():
+    with pytest.raises(LLMError):
+        LLMService()._parse_quiz_questions("{\"questions\": [", 5)
+
+
+def test_quiz_pool_tops_up_a_short_pool():
+    pool = QuizPool()
+    pool.invalidate(1)
+    pool.add(1, "faust", [_question("Wer?"), _question("wer? "), _question("Wo?")])
+
+    assert len(pool.take(1, "faust", 3)) == 2
+    pool.add(1, "faust", [_question("Wann?")])
+    assert len(pool.take(1, "faust", 3)) == 3
+    assert pool.stats() == {"topics": 1, "questions": 3, "hits": 1, "top_ups": 1}
+
+
+def test_quiz_pool_caps_the_questions_per_topic():
+    pool = QuizPool(RAGConfig(QUIZ_POOL_MAX_QUESTIONS=2))
+    pool.invalidate(1)
+    pool.add(1, "faust", [_question("Wer?"), _question("Wo?"), _question("Wann?")])
+
+    assert [question["question"] for question in pool.questions(1, "faust")] == ["Wo?", "Wann?"]
+
+
+def test_quiz_pool_invalidation_drops_old_questions():
+    pool = QuizPool()
+    pool.invalidate(1)
+    pool.add(1, "faust", [_question("Wer?")])
+
+    pool.invalidate(2)
+    # a generation that started before the rebuild finishes afterwards
+    pool.add(1, "faust", [_question("Wo?")])
+
+    assert pool.take(2, "faust", 1) == []
+    assert pool.questions(1, "faust") == []
+    assert pool.stats()["topics"] == 0
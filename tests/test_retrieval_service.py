@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from config.config import RAGConfig
+from src.services.retrieval_service import RetrievalService
+
+class _EmbedModel:
+
+    # queries and passages deliberately embed differently, like models with separate instructions
+    def get_query_embedding(self, query):
+        return [float(len(query)), 1.0]
+
+    def get_text_embedding_batch(self, texts):
+        return [[float(len(text)), -1.0] for text in texts]
+
+def _index():
+    return SimpleNamespace(_embed_model=_EmbedModel())
+
+def test_embed_queries_uses_the_query_path():
+    index = _index()
+    query = "Wer druckte die Gutenberg-Bibel?"
+
+    batched = RetrievalService(RAGConfig(QUERY_EMBEDDING_CACHE_SIZE=0)).embed_queries(index, [query])
+    single = RetrievalService(RAGConfig(QUERY_EMBEDDING_CACHE_SIZE=0)).embed_query(index, query)
+
+    assert batched.tolist() == [single]
+
+def test_embed_queries_reuses_cached_query_embeddings():
+    index = _index()
+    service = RetrievalService(RAGConfig())
+    single = service.embed_query(index, "Römischer Index")
+
+    batched = service.embed_queries(index, ["Römischer Index", "Buchdruck", "Römischer Index"])
+
+    assert batched.shape == (3, 2)
+    assert batched[0].tolist() == single
+    assert np.array_equal(batched[0], batched[2])
+    assert service.embedding_cache.stats()["hits"] == 2
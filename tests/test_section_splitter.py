@@ -0,0 +1,55 @@
+from llama_index.core import Document
+
+from src.services.section_splitter import SECTION_TITLES_KEY, SectionSplitter
+
+
+def _splitter(chunk_size):
+    # one token per word keeps the chunk sizes easy to follow
+    return SectionSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=0,
+        tokenizer=str.split,
+        chunking_tokenizer_fn=lambda text: text.split(". "),
+    )
+
+
+def _section(title, *lines):
+    return {"title": title, "text": list(lines)}
+
+
+def test_short_sections_share_a_chunk_with_all_their_titles():
+    chunks = _splitter(20)._chunk_sections([_section("A", "eins zwei"), _section("B", "drei vier")])
+
+    assert chunks == [(["A", "B"], "# A\neins zwei\n# B\ndrei vier")]
+
+
+def test_a_section_that_does_not_fit_starts_a_new_chunk():
+    chunks = _splitter(8)._chunk_sections([_section("A", "eins zwei"), _section("B", "drei vier fünf")])
+
+    assert chunks == [(["A"], "# A\neins zwei"), (["B"], "# B\ndrei vier fünf")]
+
+
+def test_an_oversized_section_is_split_with_its_heading_on_every_piece():
+    chunks = _splitter(8)._chunk_sections([_section("A", "eins zwei drei. vier fünf sechs. sieben acht neun")])
+
+    assert len(chunks) > 1
+    for titles, text in chunks:
+        assert titles == ["A"]
+        assert text.startswith("# A\n")
+        assert len(text.split()) <= 8
+
+
+def test_the_document_metadata_counts_against_the_chunk_size():
+    sections = [_section("A", "eins zwei"), _section("B", "drei vier")]
+
+    assert len(_splitter(9)._chunk_sections(sections)) == 1
+    assert len(_splitter(9)._chunk_sections(sections, "file_name: faust.pdf")) == 2
+
+
+def test_the_title_is_not_embedded_a_second_time():
+    document = Document(text="# A\neins zwei\n# B\ndrei vier")
+
+    [node] = _splitter(20).get_nodes_from_documents([document])
+
+    assert node.metadata[SECTION_TITLES_KEY] == ["A", "B"]
+    assert node.get_content(metadata_mode="embed") == node.get_content()